@@ -1,20 +1,33 @@
 import argparse
 import logging
 import sys
-from typing import Dict, List, Optional, Tuple, Type
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
 
-from scraper.download import Download
 from scraper.exceptions import MangaDoesNotExist
-from scraper.manga import Manga
-from scraper.menu import SearchMenu
-from scraper.parsers.mangareader import MangaReader
-from scraper.parsers.mangafast import MangaFast
-from scraper.parsers.types import SiteParserClass
+from scraper.manga import ENGINES
+from scraper.parsers import site_parsers
+from scraper.parsers.types import SearcherClass, SiteParserClass
 from scraper.uploaders.types import Uploader
-from scraper.uploaders.uploaders import DropboxUploader, MegaUploader, PcloudUploader
-from scraper.utils import menu_input, settings
+from scraper.utils import menu_input, override_settings, settings
 
-CONFIG = settings()["config"]
+# modules pulling in PIL, reportlab, bs4 or the uploader SDKs are imported
+# where they are used, so short invocations like --help start quickly
+if TYPE_CHECKING:
+    from scraper.manga import Manga, Volume
 
 logging.basicConfig(
     level=logging.INFO, format="%(message)s",
@@ -24,6 +37,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def cli_config() -> Mapping[str, str]:
+    """
+    The [config] settings, read when needed rather than on import
+    """
+    return settings()["config"]
+
+
 def get_volume_values(volume: str) -> List[int]:
     """
     Transform a string digit into a list of integers
@@ -34,11 +54,15 @@ def get_volume_values(volume: str) -> List[int]:
     return [int(x) for x in volume.split()]
 
 
-def manga_search(query: List[str], parser: SiteParserClass) -> Tuple[str, List[str]]:
+def manga_search(
+    query: List[str], parser: SearcherClass
+) -> Tuple[str, List[str], str]:
     """
-    Search for a manga and return the manga name and volumes
-    selected by user input
+    Search for a manga and return the manga name, volumes
+    and source selected by user input
     """
+    from scraper.menu import SearchMenu
+
     menu = SearchMenu(query, parser)
     manga = menu.handle_options()
     msg = (
@@ -46,17 +70,14 @@ def manga_search(query: List[str], parser: SiteParserClass) -> Tuple[str, List[s
         "(Enter alone to download all volumes)?"
     )
     volumes = menu_input(msg)
-    return (manga.strip(), volumes.split())
+    return (manga.strip(), volumes.split(), menu.selected_source())
 
 
 def get_manga_parser(source: str) -> SiteParserClass:
     """
     Use the string to return correct parser class
     """
-    sources: Dict[str, SiteParserClass] = {
-        "mangareader": MangaReader,
-        "mangafast": MangaFast,
-    }
+    sources = site_parsers()
     parser = sources.get(source)
     if not parser:
         if source == "mangakaka":
@@ -71,36 +92,80 @@ def download_manga(
     filetype: str,
     parser: SiteParserClass,
     preferred_name: Optional[str] = None,
-) -> Manga:
-    downloader = Download(manga_name, filetype, parser)
+    engine: str = "pool",
+    on_saved: Optional[Callable[["Manga", "Volume", Optional[BinaryIO]], Any]] = None,
+    diskless: bool = False,
+    uploaded: Optional[Callable[[Path], bool]] = None,
+) -> "Manga":
+    from scraper.download import Download
+
+    downloader = Download(
+        manga_name, filetype, parser, engine, on_saved, diskless, uploaded
+    )
     manga = downloader.download_volumes(volumes, preferred_name)
     return manga
 
 
-def upload(manga: Manga, service: str) -> Uploader:
+def uploader_class(service: str) -> Type[Uploader]:
+    from scraper.uploaders.uploaders import (
+        DropboxUploader,
+        MegaUploader,
+        PcloudUploader,
+    )
+
     services: Dict[str, Type[Uploader]] = {
         "dropbox": DropboxUploader,
         "mega": MegaUploader,
         "pcloud": PcloudUploader,
     }
-    uploader = services[service]()
-    return uploader(manga)
+    return services[service]
+
+
+@lru_cache()
+def get_uploader(service: str) -> Uploader:
+    """
+    Uploader for a service, which logs in the first time it's needed
+
+    The same uploader is reused for the rest of the run, including when
+    the cli retries with a search.
+    """
+    return uploader_class(service)()
 
 
 def cli(arguments: List[str]) -> dict:
     parser = get_parser()
     args = vars(parser.parse_args(arguments))
-    manga_parser = get_manga_parser(args["source"])
 
     if args["remove"] and not args["upload"]:
         raise IOError("Cannot use --remove without --upload")
 
+    if args["diskless"] and not args["upload"]:
+        raise IOError("Cannot use --diskless without --upload")
+
+    if args["diskless"] and not uploader_class(args["upload"]).streams:
+        raise IOError(f"Cannot use --diskless with {args['upload']}")
+
+    if args["output"] != cli_config()["manga_directory"]:
+        override_settings(manga_directory=args["output"])
+
+    if args["source"] == "all" and not args["search"]:
+        raise IOError("Cannot use --source all without --search")
+
     if args["search"]:
-        args["manga"], args["volumes"] = manga_search(args["search"], manga_parser)
+        from scraper.parsers.multi import AllSources
+
+        searcher: SearcherClass = (
+            AllSources if args["source"] == "all" else get_manga_parser(args["source"])
+        )
+        args["manga"], args["volumes"], args["source"] = manga_search(
+            args["search"], searcher
+        )
 
     else:
         args["manga"] = " ".join(args["manga"])
 
+    manga_parser = get_manga_parser(args["source"])
+
     if args["volumes"]:
         volumes: List[int] = []
         for vol in args["volumes"]:
@@ -109,29 +174,97 @@ def cli(arguments: List[str]) -> dict:
     else:
         args["volumes"] = None
 
+    service = args["upload"]
+    streamed: Set[int] = set()
+
+    def upload_saved(
+        manga: "Manga", volume: "Volume", file: Optional[BinaryIO]
+    ) -> None:
+        get_uploader(service).upload_saved_volume(manga, volume, file, args["remove"])
+        streamed.add(volume.number)
+
+    def uploaded(path: Path) -> bool:
+        return get_uploader(service).uploaded(path)
+
+    download = partial(
+        download_manga,
+        volumes=args["volumes"],
+        filetype=args["filetype"],
+        parser=manga_parser,
+        preferred_name=args["override_name"],
+        engine=args["engine"],
+        on_saved=upload_saved if service else None,
+        diskless=args["diskless"],
+        uploaded=uploaded if service else None,
+    )
     try:
-        manga = download_manga(
-            manga_name=args["manga"],
-            volumes=args["volumes"],
-            filetype=args["filetype"],
-            parser=manga_parser,
-            preferred_name=args["override_name"],
-        )
+        manga = download(manga_name=args["manga"])
     except MangaDoesNotExist:
-        logging.info(
-            f"No manga found for {args['manga']}. Searching for closest match."
-        )
-        updated_args = change_args_to_search(args)
-        return cli(updated_args)
+        manga = download_closest_match(args, manga_parser, download)
+        if manga is None:
+            logging.info(
+                f"No manga found for {args['manga']}. Searching for closest match."
+            )
+            updated_args = change_args_to_search(args)
+            return cli(updated_args)
+
+    if service:
+        # volumes saved by an earlier run weren't uploaded as they downloaded
+        remaining = [v for v in manga.volumes if v.number not in streamed]
+        if remaining:
+            get_uploader(service).upload(manga, remaining)
+
+        if args["remove"]:
+            for volume in remaining:
+                volume.file_path.unlink()
 
-    if args["upload"]:
-        upload(manga, args["upload"])
+    return args
 
-    if args["remove"]:
-        for volume in manga.volumes:
-            volume.file_path.unlink()
 
-    return args
+def download_closest_match(
+    args: Dict[str, Any], parser: SiteParserClass, download: Callable[..., "Manga"]
+) -> Optional["Manga"]:
+    """
+    Download the closest match to the manga name in the sources
+    catalog, which avoids a network search for simple typos
+    """
+    from scraper.catalog import catalog
+
+    index = catalog(parser().base_url)
+    closest = index.closest(args["manga"])
+    if closest:
+        logging.info(f"No manga found for {args['manga']}. Trying {closest} instead.")
+    else:
+        closest = choose_candidate(args["manga"], index.candidates(args["manga"]))
+    if not closest or closest == args["manga"]:
+        return None
+    try:
+        manga = download(manga_name=closest)
+    except MangaDoesNotExist:
+        return None
+    args["manga"] = closest
+    return manga
+
+
+def choose_candidate(name: str, candidates: List[Tuple[str, str]]) -> Optional[str]:
+    """
+    Ask which catalog entry was meant when none match name confidently
+
+    Returns None if there are no candidates or none are chosen.
+    """
+    if not candidates:
+        return None
+    options = "\n".join(
+        f"{i}. {title} ({slug})" for i, (slug, title) in enumerate(candidates, 1)
+    )
+    msg = (
+        f"No manga found for {name}. Did you mean one of these?\n\n{options}\n\n"
+        "Enter the number of the manga (Enter alone to search instead)"
+    )
+    choice = menu_input(msg).strip()
+    if choice.isdigit() and 0 < int(choice) <= len(candidates):
+        return candidates[int(choice) - 1][0]
+    return None
 
 
 def change_args_to_search(args: Dict[str, Optional[str]]) -> List[Optional[str]]:
@@ -141,7 +274,7 @@ def change_args_to_search(args: Dict[str, Optional[str]]) -> List[Optional[str]]
     updated_args = []
     args.update({"manga": None, "volumes": None, "search": args["manga"]})
 
-    flags = ["remove"]
+    flags = ["remove", "diskless"]
 
     for k, v in args.items():
         if (k == "upload" and not v) or (k in flags and v is False):
@@ -164,6 +297,7 @@ def cli_entry() -> None:
 
 
 def get_parser() -> argparse.ArgumentParser:
+    config = cli_config()
     parser = argparse.ArgumentParser(
         description="downloads and converts manga volumes to pdf or cbz format"
     )
@@ -174,22 +308,27 @@ def get_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--volumes", "-q", nargs="+", type=str, help="manga volume to download"
     )
-    parser.add_argument("--output", "-o", default=CONFIG["manga_directory"])
+    parser.add_argument(
+        "--output",
+        "-o",
+        default=config["manga_directory"],
+        help="directory to save downloaded files to",
+    )
     parser.add_argument(
         "--filetype",
         "-f",
         type=str,
         choices={"pdf", "cbz"},
-        default=CONFIG["filetype"],
+        default=config["filetype"],
         help="format to store manga as",
     )
     parser.add_argument(
         "--source",
         "-z",
         type=str,
-        choices={"mangareader", "mangakaka", "mangafast"},
-        default=CONFIG["source"],
-        help="website to scrape data from",
+        choices={"mangareader", "mangakaka", "mangafast", "all"},
+        default=config["source"],
+        help="website to scrape data from, all searches every website",
     )
     parser.add_argument(
         "--upload",
@@ -210,6 +349,20 @@ def get_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="delete downloaded volumes aftering uploading to a cloud service",
     )
+    parser.add_argument(
+        "--diskless",
+        "-d",
+        action="store_true",
+        help="stream volumes to dropbox as they convert, without saving them",
+    )
+    parser.add_argument(
+        "--engine",
+        "-e",
+        type=str,
+        choices=ENGINES,
+        default=config.get("engine", "pool"),
+        help="download with a shared thread pool or a single asyncio event loop",
+    )
     parser.add_argument(
         "--version",
         "-v",
@@ -0,0 +1,397 @@
+"""
+Persistent caches stored under the cache directory
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+from scraper.utils import cache_directory, get_session, settings
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalises a url so that trivially different urls share a cache entry
+
+    The scheme and fragment are dropped and the host is lowercased.
+    """
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    return urlunsplit(("", netloc, parts.path, parts.query, ""))
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_json(path: Path) -> Optional[Any]:
+    """
+    Returns the contents of a JSON file, None if missing or corrupt
+    """
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_json(path: Path, data: Any) -> None:
+    """
+    Atomically replace a JSON file so readers never see partial writes
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}")
+    tmp.write_text(json.dumps(data))
+    tmp.replace(path)
+
+
+def evict_oldest(directory: Path, max_entries: int) -> None:
+    """
+    Remove the least recently written JSON files until max_entries remain
+    """
+    entries = []
+    for path in directory.glob("*.json"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    entries.sort()
+    for _, path in entries[: max(len(entries) - max_entries, 0)]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ImageCache:
+    """
+    Content addressed on-disk store of page images
+
+    Image bytes are stored in objects/ named by their SHA256 and
+    urls/ maps the hash of each canonical image url to its object.
+    Objects are evicted least recently used first once the total
+    size exceeds max_size bytes. A max_size of 0 disables the cache.
+    """
+
+    def __init__(self, directory: Path, max_size: int) -> None:
+        self.directory: Path = directory
+        self.max_size: int = max_size
+        self.objects: Path = directory / "objects"
+        self.urls: Path = directory / "urls"
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _url_path(self, url: str) -> Path:
+        return self.urls / _sha256(canonical_url(url).encode())
+
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Returns the cached image for a url, if present and intact
+        """
+        if not self.enabled:
+            return None
+        try:
+            digest = self._url_path(url).read_text()
+            obj = self.objects / digest
+            data = obj.read_bytes()
+        except (FileNotFoundError, OSError):
+            return None
+        if _sha256(data) != digest:
+            logger.warning(f"Discarding corrupt cached image for {url}")
+            self._discard(obj, len(data))
+            return None
+        # mtime records the last access for LRU eviction
+        os.utime(obj)
+        return data
+
+    def path(self, url: str, size: int) -> Optional[Path]:
+        """
+        File holding the cached image of a url, if it is size bytes long
+        """
+        if not self.enabled:
+            return None
+        try:
+            obj = self.objects / self._url_path(url).read_text()
+            if obj.stat().st_size == size:
+                return obj
+        except OSError:
+            pass
+        return None
+
+    def put(self, url: str, data: bytes) -> None:
+        """
+        Stores an image against its url
+        """
+        if not self.enabled:
+            return None
+        digest = _sha256(data)
+        obj = self.objects / digest
+        with self._lock:
+            self.objects.mkdir(parents=True, exist_ok=True)
+            self.urls.mkdir(parents=True, exist_ok=True)
+            if not obj.exists():
+                size = self.size()
+                tmp = obj.with_suffix(f".{os.getpid()}.{threading.get_ident()}")
+                tmp.write_bytes(data)
+                tmp.replace(obj)
+                self._size = size + len(data)
+            self._url_path(url).write_text(digest)
+            if self.size() > self.max_size:
+                self._evict()
+
+    def _discard(self, obj: Path, size: int) -> None:
+        """
+        Remove an object, which another thread or process may already have
+        """
+        with self._lock:
+            try:
+                obj.unlink()
+            except FileNotFoundError:
+                return None
+            if self._size is not None:
+                self._size -= size
+
+    def size(self) -> int:
+        """
+        Total size of all stored images in bytes
+        """
+        if self._size is None:
+            if not self.objects.exists():
+                return 0
+            self._size = sum(obj.stat().st_size for obj in self.objects.iterdir())
+        return self._size
+
+    def _evict(self) -> None:
+        """
+        Remove least recently used images until within max_size
+
+        The url mappings of removed images are removed along with them.
+        """
+        objects = sorted(
+            ((obj.stat(), obj) for obj in self.objects.iterdir()),
+            key=lambda x: x[0].st_mtime,
+        )
+        size = sum(stat.st_size for stat, _ in objects)
+        evicted = set()
+        for stat, obj in objects:
+            if size <= self.max_size:
+                break
+            try:
+                obj.unlink()
+            except FileNotFoundError:
+                pass
+            evicted.add(obj.name)
+            size -= stat.st_size
+        self._size = size
+        if evicted:
+            self._prune_urls(evicted)
+
+    def _prune_urls(self, digests: Set[str]) -> None:
+        """
+        Remove the url mappings that point to any of digests
+        """
+        for mapping in self.urls.iterdir():
+            try:
+                if mapping.read_text() in digests:
+                    mapping.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class JsonCache:
+    """
+    On-disk store of JSON serialisable values that expire after ttl seconds
+
+    A ttl of 0 disables the cache. If max_entries is set the oldest
+    entries are removed once it is exceeded.
+    """
+
+    def __init__(
+        self, directory: Path, ttl: int, max_entries: Optional[int] = None
+    ) -> None:
+        self.directory: Path = directory
+        self.ttl: int = ttl
+        self.max_entries: Optional[int] = max_entries
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{_sha256(key.encode())}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the value stored against key if it hasn't expired
+        """
+        if not self.enabled:
+            return None
+        entry = read_json(self._path(key))
+        if entry is None or time.time() - entry["time"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def put(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return None
+        write_json(self._path(key), {"time": time.time(), "value": value})
+        if self.max_entries:
+            self._evict()
+
+    def _evict(self) -> None:
+        evict_oldest(self.directory, self.max_entries)
+
+
+class HttpCache:
+    """
+    On-disk cache of page text revalidated with ETag & Last-Modified
+
+    Each url belongs to a class (e.g. series or chapter) with its own
+    ttl. Entries younger than their ttl are served without a request,
+    older entries are revalidated with a conditional request. Pages
+    longer than max_page_size characters aren't stored, and if
+    max_entries is set the oldest entries are removed once it is
+    exceeded.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ttls: Dict[str, int],
+        max_entries: Optional[int] = None,
+        max_page_size: Optional[int] = None,
+    ) -> None:
+        self.directory: Path = directory
+        self.ttls: Dict[str, int] = ttls
+        self.max_entries: Optional[int] = max_entries
+        self.max_page_size: Optional[int] = max_page_size
+
+    def _storable(self, url_class: str, response: requests.Response) -> bool:
+        """
+        Whether a response is worth storing
+
+        A 304 carries no body, so there is no point keeping the validators
+        of a page too large to keep the text of.
+        """
+        if self.max_page_size is not None and len(response.text) > self.max_page_size:
+            return False
+        headers = response.headers
+        validated = headers.get("ETag") or headers.get("Last-Modified")
+        return bool(self.ttls[url_class] or validated)
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{_sha256(canonical_url(url).encode())}.json"
+
+    def fetch(self, url: str, url_class: str) -> str:
+        """
+        Returns the text of a url, from the cache where possible
+        """
+        path = self._path(url)
+        entry = read_json(path)
+        if entry and time.time() - entry["time"] <= self.ttls[url_class]:
+            return entry["text"]
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = get_session().get(url, headers=headers)
+        if entry and response.status_code == 304:
+            entry["time"] = time.time()
+            write_json(path, entry)
+            return entry["text"]
+        response.raise_for_status()
+        if not self._storable(url_class, response):
+            return response.text
+        entry = {
+            "time": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "text": response.text,
+        }
+        write_json(path, entry)
+        if self.max_entries:
+            evict_oldest(self.directory, self.max_entries)
+        return response.text
+
+    def invalidate(self, url: str) -> None:
+        """
+        Remove a url, e.g. if its page turns out not to be final
+        """
+        try:
+            self._path(url).unlink()
+        except FileNotFoundError:
+            pass
+
+
+@functools.lru_cache()
+def http_cache() -> HttpCache:
+    """
+    HTTP cache shared by every parser in this process
+
+    Chapters don't change once released so are kept for 30 days by
+    default, series pages are always revalidated.
+    """
+    config = settings()["config"]
+    ttls = {
+        "series": int(config.get("series_cache_ttl", 0)),
+        "chapter": int(config.get("chapter_cache_ttl", 30 * 24 * 60 * 60)),
+    }
+    return HttpCache(
+        cache_directory() / "http",
+        ttls,
+        max_entries=int(config.get("http_cache_size", 2048)),
+        max_page_size=int(config.get("http_cache_page_size", 1024)) * 1024,
+    )
+
+
+@functools.lru_cache()
+def chapter_list_cache() -> JsonCache:
+    """
+    Chapter numbers of each manga, shared across runs
+    """
+    ttl = int(settings()["config"].get("chapter_list_ttl", 0))
+    return JsonCache(cache_directory() / "chapters", ttl)
+
+
+@functools.lru_cache()
+def search_cache() -> JsonCache:
+    """
+    Search results of every source, shared across runs
+    """
+    config = settings()["config"]
+    return JsonCache(
+        cache_directory() / "searches",
+        ttl=int(config.get("search_cache_ttl", 24 * 60 * 60)),
+        max_entries=int(config.get("search_cache_size", 256)),
+    )
+
+
+def normalise_query(query: str) -> str:
+    """
+    Searches differing only in case or whitespace share a cache entry
+    """
+    return " ".join(query.lower().split())
+
+
+@functools.lru_cache()
+def image_cache() -> ImageCache:
+    """
+    Image cache shared by every parser in this process
+    """
+    megabytes = int(settings()["config"].get("image_cache_size", 2048))
+    return ImageCache(cache_directory() / "images", megabytes * 1024 * 1024)
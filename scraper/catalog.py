@@ -0,0 +1,132 @@
+"""
+Offline index of the manga available on each source
+"""
+
+import functools
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from scraper.cache import read_json, write_json
+from scraper.new_types import SearchResults
+from scraper.utils import cache_directory
+
+# similarity a catalog entry needs to replace a mistyped name unasked,
+# along with its lead over the next closest entry
+MATCH_THRESHOLD = 0.85
+MATCH_MARGIN = 0.15
+# entries at least this similar are offered when no match is confident
+CANDIDATE_THRESHOLD = 0.5
+MAX_CANDIDATES = 5
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Character trigrams of text, ignoring case, spaces & punctuation
+    """
+    text = f"  {re.sub(r'[^a-z0-9]', '', text.lower())} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(first: str, second: str) -> float:
+    """
+    Jaccard similarity of two strings trigrams, from 0 to 1
+    """
+    first_trigrams, second_trigrams = trigrams(first), trigrams(second)
+    union = first_trigrams | second_trigrams
+    return len(first_trigrams & second_trigrams) / len(union) if union else 0.0
+
+
+class Catalog:
+    """
+    Titles, slugs & chapter counts seen on a source
+
+    Harvested from search results and series pages so manga names can
+    be resolved without searching the source.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self.entries: Dict[str, Dict[str, str]] = read_json(path) or {}
+        self._lock = threading.Lock()
+
+    def _save(self) -> None:
+        # merge with entries added by other processes since this one loaded
+        entries = read_json(self.path) or {}
+        entries.update(self.entries)
+        self.entries = entries
+        write_json(self.path, entries)
+
+    def _add(
+        self, slug: str, title: Optional[str] = None, chapters: Optional[str] = None
+    ) -> None:
+        entry = self.entries.setdefault(slug, {"title": slug.replace("-", " ")})
+        if title:
+            entry["title"] = title
+        if chapters is not None:
+            entry["chapters"] = chapters
+
+    def add(
+        self, slug: str, title: Optional[str] = None, chapters: Optional[int] = None
+    ) -> None:
+        """
+        Record a manga found on the source
+        """
+        with self._lock:
+            self._add(slug, title, None if chapters is None else str(chapters))
+            self._save()
+
+    def add_results(self, results: SearchResults) -> None:
+        """
+        Record every manga in a sources search results
+        """
+        with self._lock:
+            for metadata in results.values():
+                self._add(
+                    metadata["manga_url"], metadata["title"], metadata["chapters"]
+                )
+            self._save()
+
+    def _ranked(self, name: str) -> List[Tuple[float, str, str]]:
+        """
+        Similarity, slug & title of every entry, most similar to name first
+        """
+        ranked = []
+        for slug, entry in self.entries.items():
+            score = max(similarity(name, slug), similarity(name, entry["title"]))
+            ranked.append((score, slug, entry["title"]))
+        return sorted(ranked, key=lambda x: x[0], reverse=True)
+
+    def candidates(self, name: str) -> List[Tuple[str, str]]:
+        """
+        Slugs & titles of the manga similar to name, most similar first
+        """
+        return [
+            (slug, title)
+            for score, slug, title in self._ranked(name)[:MAX_CANDIDATES]
+            if score >= CANDIDATE_THRESHOLD
+        ]
+
+    def closest(self, name: str) -> Optional[str]:
+        """
+        Slug of the manga most similar to name, if it is a confident match
+
+        The match must be close to name & clearly closer than any other
+        entry, as names a word apart are often different series.
+        """
+        ranked = self._ranked(name)
+        if not ranked or ranked[0][0] < MATCH_THRESHOLD:
+            return None
+        runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+        return ranked[0][1] if ranked[0][0] - runner_up >= MATCH_MARGIN else None
+
+
+@functools.lru_cache()
+def catalog(base_url: str) -> Catalog:
+    """
+    Catalog of the source hosted at base_url
+    """
+    host = urlsplit(base_url).netloc or base_url
+    return Catalog(cache_directory() / "catalog" / f"{host}.json")
@@ -2,38 +2,182 @@
 Downloads manga page images
 """
 
+import io
 import logging
-import tempfile
+import shutil
+import threading
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from io import BytesIO
 from logging import LoggerAdapter
-from multiprocessing.pool import Pool
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+from multiprocessing.pool import AsyncResult, Pool
 from pathlib import Path
-from typing import Callable, List, Optional, Type
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Type
 
 from PIL import Image
 from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 
+from scraper.exceptions import UnsupportedImage
 from scraper.manga import Manga, MangaBuilder, Volume
 from scraper.parsers.types import SiteParser
+from scraper.pdf import check_jpeg, image_size, write_jpeg_pdf
+from scraper.pipe import CHUNK_SIZE, PipeReader, PipeWriter
 from scraper.utils import download_timer, get_adapter, settings
 
 logger = logging.getLogger(__name__)
 
 
+def _reportlab_pdf(volume: Volume, sink: BinaryIO) -> None:
+    c = canvas.Canvas(sink)
+    for page in volume.pages:
+        data = page.read()
+        img = BytesIO(data)
+        width, height = image_size(data) or Image.open(img).size
+        c.setPageSize((width, height))
+        imgreader = ImageReader(img)
+        c.drawImage(imgreader, x=0, y=0)
+        c.showPage()
+    c.save()
+
+
+def write_pdf(volume: Volume, sink: BinaryIO, adapter: LoggerAdapter) -> None:
+    """
+    Write all pages of a volume to sink as a PDF
+
+    JPEG pages are embedded as they are, without being decoded, unless
+    the pdf_writer setting is reportlab. Volumes with other images fall
+    back to reportlab.
+    """
+    if settings()["config"].get("pdf_writer", "passthrough") == "passthrough":
+        seekable = sink.seekable()
+        start = sink.tell() if seekable else 0
+        try:
+            if not seekable:
+                # a stream can't be rewound, so every page is checked first
+                for page in volume.pages:
+                    check_jpeg(page.read())
+            write_jpeg_pdf((page.read() for page in volume.pages), sink)
+            return None
+        except UnsupportedImage as e:
+            adapter.debug(f"{e}, writing volume {volume.number} with reportlab")
+            if seekable:
+                sink.seek(start)
+                sink.truncate()
+    _reportlab_pdf(volume, sink)
+
+
+def to_pdf(
+    volume: Volume, adapter: LoggerAdapter, sink: Optional[BinaryIO] = None
+) -> None:
+    """
+    Save all pages to a PDF file, or to sink if given
+    """
+    if not volume.pages:
+        return None
+    if sink is not None:
+        return write_pdf(volume, sink, adapter)
+    adapter.info(f"Volume {volume.number} saved to {volume.file_path}")
+    with open(volume.file_path, "wb") as pdf:
+        write_pdf(volume, pdf, adapter)
+
+
+def write_cbz(volume: Volume, sink: BinaryIO) -> None:
+    """
+    Stream the pages of a volume into a CBZ archive written to sink
+
+    Page images are already compressed so are stored as they are.
+    """
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as cbz:
+        for page in volume.pages:
+            jpgfilename = f"{page.number:03d}_{volume.number}.jpg"
+            with page.open() as img, cbz.open(jpgfilename, "w") as entry:
+                shutil.copyfileobj(img, entry)
+
+
+def to_cbz(
+    volume: Volume, adapter: LoggerAdapter, sink: Optional[BinaryIO] = None
+) -> None:
+    """
+    Save all pages to a CBZ file, or to sink if given
+
+    The naming schema is important. If too much info is
+    within the jpg file name the page order can be read
+    wrong in some CBZ readers. The most reliable format is
+    like 001_1.jpg (<pag_num>_<vol_num>.jpg).
+
+    See forum post for more details:
+        https://tinyurl.com/uu5kvjf
+    """
+    if not volume.pages:
+        return None
+    if sink is not None:
+        return write_cbz(volume, sink)
+    adapter.info(f"Volume {volume.number} saved to {volume.file_path}")
+    with open(volume.file_path, "wb") as cbz:
+        write_cbz(volume, cbz)
+
+
+CONVERTERS: Dict[str, Callable[[Volume, LoggerAdapter, Optional[BinaryIO]], None]] = {
+    "pdf": to_pdf,
+    "cbz": to_cbz,
+}
+
+
+def save_volume(
+    manga_name: str,
+    filetype: str,
+    volume: Volume,
+    stream: Optional[Connection] = None,
+) -> None:
+    """
+    Converts a volume to the given filetype within a worker process
+
+    The volume is saved to the manga directory, or if stream is given
+    sent over it in chunks rather than saved.
+    """
+    adapter = get_adapter(logger, manga_name)
+    if stream is None:
+        return CONVERTERS[filetype](volume, adapter, None)
+    writer = PipeWriter(stream)
+    with io.BufferedWriter(writer, CHUNK_SIZE) as sink:
+        CONVERTERS[filetype](volume, adapter, sink)
+        sink.flush()
+        writer.finish()
+
+
 class Download:
     """
     Downloads the manga in the desired format
     """
 
     def __init__(
-        self, manga_name: str, filetype: str, parser: Type[SiteParser]
+        self,
+        manga_name: str,
+        filetype: str,
+        parser: Type[SiteParser],
+        engine: str = "pool",
+        on_saved: Optional[Callable[[Manga, Volume, Optional[BinaryIO]], Any]] = None,
+        diskless: bool = False,
+        uploaded: Optional[Callable[[Path], bool]] = None,
     ) -> None:
         self.manga_name: str = manga_name
-        self.factory: MangaBuilder = MangaBuilder(parser=parser(manga_name))
+        self.factory: MangaBuilder = MangaBuilder(
+            parser=parser(manga_name), engine=engine
+        )
         self.adapter: LoggerAdapter = get_adapter(logger, manga_name)
         self.type: str = filetype
+        self.on_saved: Optional[Callable[[Manga, Volume, Optional[BinaryIO]], Any]] = (
+            on_saved
+        )
+        if diskless and on_saved is None:
+            raise ValueError("Diskless downloads need on_saved to take each volume")
+        self.diskless: bool = diskless
+        # skips volumes already in the cloud when given
+        self.uploaded: Optional[Callable[[Path], bool]] = uploaded
 
     def _create_manga_dir(self, manga_name: str) -> None:
         """
@@ -43,53 +187,78 @@ class Download:
         manga_dir = Path(download_dir) / manga_name
         manga_dir.mkdir(parents=True, exist_ok=True)
 
-    def _to_pdf(self, volume: Volume) -> None:
+    def _spool(self, volume: Volume) -> Volume:
         """
-        Save all pages to a PDF file
+        Returns a copy of the volume to send to a conversion worker
+
+        Pages still in memory are converted from memory rather than read
+        back from disk. Spooled pages refer to their journal files, so
+        only their paths need to be pickled rather than their images.
         """
-        if not volume.pages:
-            return None
-        self.adapter.info(f"Volume {volume.number} saved to {volume.file_path}")
-        c = canvas.Canvas(str(volume.file_path))
-        for page in volume.pages:
-            img = BytesIO(page.img)
-            cover = Image.open(img)
-            width, height = cover.size
-            c.setPageSize((width, height))
-            imgreader = ImageReader(img)
-            c.drawImage(imgreader, x=0, y=0)
-            c.showPage()
-        c.save()
-
-    def _to_cbz(self, volume: Volume) -> None:
+        spooled = Volume(volume.number, volume.file_path, volume.upload_path)
+        # properties cause an error in mypy when getter/setters input
+        # differ, mypy thinks they should be the same
+        spooled.pages = [  # type: ignore
+            (page.number, page.path if page.img is None else page.img)
+            for page in volume.pages
+        ]
+        return spooled
+
+    def _volume_saved(
+        self,
+        manga: Manga,
+        volume: Volume,
+        queue_slots: threading.BoundedSemaphore,
+        uploads: List[Future],
+        uploader: ThreadPoolExecutor,
+        stream: Optional[Connection],
+        _: Any,
+    ) -> None:
         """
-        Save all pages to a CBZ file
+        Frees the volumes conversion queue slot, its memory & its journal
 
-        The naming schema is important. If too much info is
-        within the jpg file name the page order can be read
-        wrong in some CBZ readers. The most reliable format is
-        like 001_1.jpg (<pag_num>_<vol_num>.jpg).
+        The volume is handed to on_saved in its own thread so the pool's
+        result handler is never held up by an upload. Diskless volumes
+        were handed on as their conversion started.
+        """
+        queue_slots.release()
+        if stream is not None:
+            stream.close()
+        self.factory.release_pages(volume)
+        self.factory.journal(volume.number).clear()
+        if self.on_saved and volume.pages and stream is None:
+            uploads.append(uploader.submit(self.on_saved, manga, volume, None))
 
-        See forum post for more details:
-            https://tinyurl.com/uu5kvjf
+    def _hand_on(self, manga: Manga, volume: Volume, stream: Connection) -> Any:
         """
-        if not volume.pages:
-            return None
-        self.adapter.info(f"Volume {volume.number} saved to {volume.file_path}")
-        with zipfile.ZipFile(str(volume.file_path), "w") as cbz:
-            for page in volume.pages:
-                jpgfilename = f"{page.number:03d}_{volume.number}.jpg"
-                tmp_jpg = Path(tempfile.gettempdir()) / jpgfilename
-                tmp_jpg.write_bytes(page.img)
-                cbz.write(tmp_jpg)
-                tmp_jpg.unlink()
-
-    def _get_save_method(self) -> Callable:
+        Passes a volume to on_saved along with a stream of its conversion
+
+        Whatever on_saved doesn't read is discarded so the conversion can
+        always finish.
         """
-        Returns the appropriate image conversion method.
+        reader = PipeReader(stream)
+        with io.BufferedReader(reader, CHUNK_SIZE) as file:
+            try:
+                return self.on_saved(manga, volume, file)
+            finally:
+                reader.drain()
+
+    def _volume_failed(
+        self,
+        volume: Volume,
+        queue_slots: threading.BoundedSemaphore,
+        stream: Optional[Connection],
+        _: Any,
+    ) -> None:
         """
-        conversion_method = {"pdf": self._to_pdf, "cbz": self._to_cbz}
-        return conversion_method.get(self.type)
+        Frees the volumes queue slot & memory, keeping its journal to resume
+
+        Closing the stream tells whatever is reading it the volume failed.
+        """
+        if stream is not None:
+            stream.close()
+        self.factory.release_pages(volume)
+        queue_slots.release()
 
     @download_timer
     def download_volumes(
@@ -97,14 +266,51 @@ class Download:
     ) -> Manga:
         """
         Download all pages and volumes
+
+        Each volume is queued for conversion as soon as its pages have
+        downloaded. Downloading pauses while the queue is full. Once
+        converted, volumes are passed to on_saved while the rest download.
+        Diskless volumes are passed to on_saved as soon as their
+        conversion starts, along with a stream of the converted file.
         """
         self.adapter.info("Starting Downloads")
-        manga = self.factory.get_manga_volumes(vol_nums, self.type, preferred_name)
+        manga = self.factory.manga(self.type, preferred_name)
+        queue_slots = threading.BoundedSemaphore(self.factory.pipeline_depth)
+        uploads: List[Future] = []
+        with Pool() as pool, ThreadPoolExecutor() as uploader:
+            results: List[AsyncResult] = []
+            for volume in self.factory.iter_volumes(manga, vol_nums, self.uploaded):
+                if not results and not self.diskless:
+                    self._create_manga_dir(manga.name)
+                queue_slots.acquire()
+                stream: Optional[Connection] = None
+                if self.diskless:
+                    received, stream = Pipe(duplex=False)
+                    uploads.append(
+                        uploader.submit(self._hand_on, manga, volume, received)
+                    )
+                result = pool.apply_async(
+                    save_volume,
+                    (manga.name, self.type, self._spool(volume), stream),
+                    callback=partial(
+                        self._volume_saved,
+                        manga,
+                        volume,
+                        queue_slots,
+                        uploads,
+                        uploader,
+                        stream,
+                    ),
+                    error_callback=partial(
+                        self._volume_failed, volume, queue_slots, stream
+                    ),
+                )
+                results.append(result)
+            for result in results:
+                result.get()
+            for upload in uploads:
+                upload.result()
         if not manga.volumes:
             return manga
-        self._create_manga_dir(manga.name)
-        save_method = self._get_save_method()
-        with Pool() as pool:
-            pool.map(save_method, manga.volumes)
         self.adapter.info("All volumes downloaded")
         return manga
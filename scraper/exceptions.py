@@ -33,3 +33,7 @@ class MangaParserNotSet(Exception):
 
 class CannotExtractChapter(Exception):
     pass
+
+
+class UnsupportedImage(Exception):
+    pass
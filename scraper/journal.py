@@ -0,0 +1,106 @@
+"""
+Durable record of the pages downloaded for each volume
+"""
+
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+from scraper.utils import cache_directory
+
+
+class VolumeJournal:
+    """
+    Stores a volumes page urls & each page as soon as it is downloaded
+
+    A download that is interrupted, or has pages that failed, can then
+    be resumed by fetching only the pages missing from the journal.
+    The journal should be cleared once the volume has been saved.
+    """
+
+    def __init__(self, base_url: str, manga_name: str, volume_number: int) -> None:
+        source = urlparse(base_url).netloc or base_url
+        self.directory: Path = (
+            cache_directory() / "journals" / source / manga_name / str(volume_number)
+        )
+        self.pages_dir: Path = self.directory / "pages"
+        self.urls_file: Path = self.directory / "page_urls.json"
+
+    def _write(self, path: Path, data: bytes) -> None:
+        """
+        Write atomically so a killed process never leaves a partial page
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    def page_urls(self) -> Optional[List[Tuple[int, str]]]:
+        if not self.urls_file.exists():
+            return None
+        return [(int(num), url) for num, url in json.loads(self.urls_file.read_text())]
+
+    def save_page_urls(self, page_urls: List[Tuple[int, str]]) -> None:
+        self._write(self.urls_file, json.dumps(page_urls).encode())
+
+    def page_path(self, page_number: int) -> Path:
+        return self.pages_dir / str(page_number)
+
+    def has_page(self, page_number: int) -> bool:
+        return self.page_path(page_number).exists()
+
+    def save_page(
+        self, page_number: int, img: bytes, cached: Optional[Path] = None
+    ) -> None:
+        """
+        Journal a page, hard linking the cached copy of img if there is one
+
+        Falls back to writing img where links aren't supported, e.g. when
+        the cache is on another filesystem.
+        """
+        path = self.page_path(page_number)
+        if cached is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+            try:
+                os.link(cached, tmp)
+                tmp.replace(path)
+                return None
+            except OSError:
+                pass
+        self._write(path, img)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class MemoryBudget:
+    """
+    Thread safe count of page image bytes held in memory
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit: int = limit
+        self.used: int = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        """
+        Returns True if size bytes fit within the budget
+        """
+        with self._lock:
+            if self.used + size > self.limit:
+                return False
+            self.used += size
+            return True
+
+    def release(self, size: int) -> None:
+        """
+        Returns size bytes to the budget once they're no longer held
+        """
+        with self._lock:
+            self.used = max(self.used - size, 0)
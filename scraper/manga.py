@@ -2,33 +2,77 @@
 Manga building blocks & factories
 """
 
+import asyncio
+import bisect
 import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from dataclasses import dataclass, field
-from multiprocessing.pool import Pool, ThreadPool
+from io import BytesIO
 from pathlib import Path
-from typing import Dict, Generator, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import requests
 
+from scraper.cache import image_cache
 from scraper.exceptions import (
     PageAlreadyPresent,
     VolumeAlreadyExists,
     VolumeAlreadyPresent,
     VolumeDoesntExist,
 )
+from scraper.journal import MemoryBudget, VolumeJournal
 from scraper.new_types import PageData, VolumeData
 from scraper.parsers.types import SiteParser
+from scraper.scheduler import Scheduler, interleave
 from scraper.utils import get_adapter, settings
 
 logger = logging.getLogger(__name__)
 
+ENGINES = ["pool", "async"]
+
 
-@dataclass(frozen=True, repr=False)
 class Page:
     """
     Holds page number & its image
+
+    The image is either held in memory or, once spooled, read lazily
+    from a file on disk. Pages are immutable & use __slots__ as a
+    manga can hold many thousands of them.
     """
 
+    __slots__ = ("number", "img", "path")
+
     number: int
-    img: bytes
+    img: Optional[bytes]
+    path: Optional[Path]
+
+    def __init__(
+        self, number: int, img: Optional[bytes] = None, path: Optional[Path] = None
+    ) -> None:
+        object.__setattr__(self, "number", number)
+        object.__setattr__(self, "img", img)
+        object.__setattr__(self, "path", path)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"cannot assign to field '{name}'")
+
+    def __reduce__(self) -> Tuple[type, Tuple[int, Optional[bytes], Optional[Path]]]:
+        return (Page, (self.number, self.img, self.path))
 
     def __repr__(self) -> str:
         return self._str()
@@ -36,10 +80,40 @@ class Page:
     def __str__(self) -> str:
         return self._str()
 
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Page):
+            return NotImplemented
+        # compared by where the image is rather than its bytes so spooled
+        # pages aren't read back from disk
+        return (self.number, self.img, self.path) == (
+            other.number,
+            other.img,
+            other.path,
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.number)
+
     def _str(self) -> str:
-        img = True if self.img else False
+        img = True if self.img or self.path else False
         return f"Page(number={self.number}, img={img})"
 
+    def read(self) -> bytes:
+        """
+        Returns the image bytes
+        """
+        if self.img is not None:
+            return self.img
+        return self.path.read_bytes()
+
+    def open(self) -> BinaryIO:
+        """
+        Returns a file object to the image
+        """
+        if self.img is not None:
+            return BytesIO(self.img)
+        return self.path.open("rb")
+
 
 @dataclass
 class Volume:
@@ -51,6 +125,10 @@ class Volume:
     file_path: Path
     upload_path: Path
     _pages: Dict[int, Page] = field(default_factory=dict, repr=False)
+    # pages kept in page number order as they are added, so reading
+    # them never requires a sort, along with their numbers to bisect
+    _ordered: List[Page] = field(default_factory=list, repr=False)
+    _numbers: List[int] = field(default_factory=list, repr=False)
 
     def __repr__(self) -> str:
         return self._str()
@@ -58,18 +136,22 @@ class Volume:
     def __str__(self) -> str:
         return self._str()
 
-    def __eq__(self, other):
-        attrs = [attr for attr in self.__dict__.keys()]
-        return all(
-            str(getattr(self, attr)) == str(getattr(other, attr)) for attr in attrs
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Volume):
+            return NotImplemented
+        # paths are compared as strings as they may be given as either
+        return (
+            self.number == other.number
+            and str(self.file_path) == str(other.file_path)
+            and str(self.upload_path) == str(other.upload_path)
+            and self._pages.keys() == other._pages.keys()
         )
 
-    def __iter__(self) -> Generator:
-        for page in self.pages:
-            yield page
+    def __iter__(self) -> Iterator[Page]:
+        return iter(self._ordered)
 
     def _str(self) -> str:
-        return f"Volume(number={self.number}, pages={len(self.pages)})"
+        return f"Volume(number={self.number}, pages={len(self._ordered)})"
 
     @property
     def page(self) -> Dict[int, Page]:
@@ -77,27 +159,40 @@ class Volume:
 
     @property
     def pages(self) -> List[Page]:
-        pages = self._pages.values()
-        sorted_pages = sorted(pages, key=lambda x: x.number)
-        return sorted_pages
+        """
+        Pages in page number order, which shouldn't be modified directly
+        """
+        return self._ordered
 
     @pages.setter
     def pages(self, metadata: List[PageData]) -> None:
         self._pages = {}
+        self._ordered = []
+        self._numbers = []
         for page_number, img in metadata:
             self.add_page(page_number, img)
 
-    def add_page(self, page_number: int, img: bytes) -> None:
+    def add_page(self, page_number: int, img: Union[bytes, Path]) -> None:
         """
-        Appends a Page object from a page number & its image
+        Appends a Page object from a page number & its image or spool file
         """
         if self.page.get(page_number):
             raise PageAlreadyPresent(f"Page {page_number} is already present")
-        page = Page(number=page_number, img=img)
+        if isinstance(img, Path):
+            page = Page(number=page_number, path=img)
+        else:
+            page = Page(number=page_number, img=img)
         self._pages[page_number] = page
+        if not self._numbers or self._numbers[-1] < page_number:
+            self._ordered.append(page)
+            self._numbers.append(page_number)
+        else:
+            index = bisect.bisect(self._numbers, page_number)
+            self._ordered.insert(index, page)
+            self._numbers.insert(index, page_number)
 
     def total_pages(self) -> int:
-        return max(self.page)
+        return self._numbers[-1] if self._numbers else 0
 
 
 @dataclass
@@ -150,6 +245,20 @@ class Manga:
         for volume in volumes:
             self.add_volume(volume)
 
+    def volume_saved(self, volume_number: int) -> bool:
+        """
+        Whether the volume has already been saved to disk
+        """
+        return self._volume_path(volume_number).exists()
+
+    def volume_uploaded(
+        self, volume_number: int, uploaded: Callable[[Path], bool]
+    ) -> bool:
+        """
+        Whether uploaded finds the volume at its upload path
+        """
+        return uploaded(self._volume_upload_path(volume_number))
+
     def add_volume(self, volume_number: int) -> None:
         if self.volume.get(volume_number):
             raise VolumeAlreadyPresent(f"Volume {volume_number} is already present")
@@ -168,47 +277,282 @@ class MangaBuilder:
     Creates Manga objects
     """
 
-    def __init__(self, parser: SiteParser) -> None:
+    def __init__(self, parser: SiteParser, engine: str = "pool") -> None:
+        if engine not in ENGINES:
+            raise ValueError(
+                f"{engine} is not a valid engine, try {', '.join(ENGINES)}"
+            )
         self.parser: SiteParser = parser
+        self.engine: str = engine
         self.adapter = get_adapter(logger, self.parser.manga.name)
+        # shared by every download so pages freed by one make room for the next
+        self.budget: MemoryBudget = self._memory_budget()
+        self.pipeline_depth: int = self._pipeline_depth()
+
+    def journal(self, volume_number: int) -> VolumeJournal:
+        """
+        Progress journal for a given volume
+        """
+        manga = self.parser.manga
+        return VolumeJournal(manga.base_url, manga.name, volume_number)
 
-    def _get_volume_data(self, volume_number: int) -> VolumeData:
+    def _get_page_urls(self, volume_number: int) -> Optional[List[Tuple[int, str]]]:
         """
-        Returns volume number & each pages raw data
+        Returns the page urls of a volume or None if it doesn't exist
         """
+        journal = self.journal(volume_number)
+        journaled_urls = journal.page_urls()
+        if journaled_urls is not None:
+            self.adapter.info(f"Resuming volume {volume_number}")
+            return journaled_urls
         self.adapter.info(f"Downloading volume {volume_number}")
         try:
-            urls = self.parser.manga.page_urls(volume_number)
+            page_urls = self.parser.manga.page_urls(volume_number)
         except VolumeDoesntExist as e:
             self.adapter.warning(e)
+            return None
+        journal.save_page_urls(page_urls)
+        return page_urls
+
+    def _memory_budget(self) -> MemoryBudget:
+        """
+        Budget for the page images held in memory during a download
+        """
+        megabytes = int(settings()["config"].get("memory_budget", 512))
+        return MemoryBudget(megabytes * 1024 * 1024)
+
+    def _release(self, pages_data: Iterable[Optional[PageData]]) -> None:
+        """
+        Returns the memory held by page images to the budget
+        """
+        held = sum(
+            len(page[1]) for page in pages_data if page and isinstance(page[1], bytes)
+        )
+        self.budget.release(held)
+
+    def release_pages(self, volume: Volume) -> None:
+        """
+        Frees a volumes in memory pages, which then refer to their journal files
+
+        Should be called once the volume has been saved, or failed to be.
+        """
+        journal = self.journal(volume.number)
+        self._release((page.number, page.img) for page in volume.pages)
+        # properties cause an error in mypy when getter/setters input
+        # differ, mypy thinks they should be the same
+        volume.pages = [  # type: ignore
+            (page.number, journal.page_path(page.number)) for page in volume.pages
+        ]
+
+    def _get_page_data(
+        self, journal: VolumeJournal, budget: MemoryBudget, page_url: Tuple[int, str]
+    ) -> Optional[PageData]:
+        """
+        Download a page and record it in the journal
+
+        The image is kept in memory while within the memory budget,
+        otherwise the page refers to its journal file instead. Returns
+        None rather than raising if the page fails to download so the
+        rest of the volume can still be journaled.
+        """
+        try:
+            page_number, img = self.parser.manga.page_data(page_url)
+        except requests.exceptions.RequestException as e:
+            self.adapter.warning(f"Failed to download page {page_url[0]}: {e}")
+            return None
+        journal.save_page(page_number, img, image_cache().path(page_url[1], len(img)))
+        if budget.reserve(len(img)):
+            return (page_number, img)
+        return (page_number, journal.page_path(page_number))
+
+    def _schedule_pages(
+        self,
+        scheduler: Scheduler,
+        page_urls: Dict[int, List[Tuple[int, str]]],
+        budget: MemoryBudget,
+    ) -> Dict[int, List[Future]]:
+        """
+        Submit every page not in a journal, alternating between volumes
+        """
+        journals = {vol: self.journal(vol) for vol in page_urls}
+        futures: Dict[int, List[Future]] = {vol: [] for vol in page_urls}
+        for volume_number, url in interleave(page_urls):
+            journal = journals[volume_number]
+            if journal.has_page(url[0]):
+                future: Future = Future()
+                future.set_result((url[0], journal.page_path(url[0])))
+            else:
+                future = scheduler.submit(
+                    url[1], self._get_page_data, journal, budget, url
+                )
+            futures[volume_number].append(future)
+        return futures
+
+    def _volume_data(
+        self, volume_number: int, pages_data: List[Optional[PageData]]
+    ) -> VolumeData:
+        """
+        Returns the volume data if every page was downloaded
+        """
+        failed = [page for page in pages_data if page is None]
+        if failed:
+            self._release(pages_data)
+            self.adapter.warning(
+                f"Volume {volume_number} is missing {len(failed)} page(s), "
+                "run again to resume downloading it"
+            )
             return (volume_number, None)
-        with ThreadPool() as pool:
-            pages_data = pool.map(self.parser.manga.page_data, urls)
         return (volume_number, pages_data)
 
-    def _get_volumes_data(
-        self, vol_nums: Optional[List[int]] = None
-    ) -> List[VolumeData]:
+    def _pipeline_depth(self) -> int:
+        """
+        Number of volumes downloading at once
+        """
+        depth = int(settings()["config"].get("pipeline_depth", 2))
+        if depth < 1:
+            raise ValueError(f"pipeline_depth must be at least 1, not {depth}")
+        return depth
+
+    def _admit_volumes(
+        self, scheduler: Scheduler, pending: Deque[int], slots: int
+    ) -> Dict[int, Future]:
         """
-        Returns list of raw volume data
+        Takes up to slots volumes off pending & requests their page urls
         """
-        volumes = self.parser.manga.all_volume_numbers() if not vol_nums else vol_nums
-        with Pool() as pool:
-            return pool.map(self._get_volume_data, volumes)
+        base_url = self.parser.manga.base_url
+        admitted = [pending.popleft() for _ in range(min(slots, len(pending)))]
+        return {
+            vol: scheduler.submit(base_url, self._get_page_urls, vol)
+            for vol in admitted
+        }
+
+    def _iter_volumes_data(self, volumes: List[int]) -> Iterator[VolumeData]:
+        """
+        Yields raw volume data as soon as each volume has downloaded
 
-    def get_manga_volumes(
+        Only pipeline_depth volumes download at once, the next volume
+        starting, page urls and all, once the consumer has taken a
+        completed one.
+        """
+        if self.engine == "async":
+            yield from self._run_async_iterator(self._aiter_volumes_data(volumes))
+            return
+        with Scheduler() as scheduler:
+            budget = self.budget
+            pending = deque(volumes)
+            active: Dict[int, List[Future]] = {}
+            while pending or active:
+                slots = self.pipeline_depth - len(active)
+                admitted: Dict[int, List[Tuple[int, str]]] = {}
+                for vol, future in self._admit_volumes(
+                    scheduler, pending, slots
+                ).items():
+                    page_urls = future.result()
+                    if page_urls is None:
+                        yield (vol, None)
+                    else:
+                        admitted[vol] = page_urls
+                active.update(self._schedule_pages(scheduler, admitted, budget))
+                running = [
+                    f for futures in active.values() for f in futures if not f.done()
+                ]
+                wait(running, return_when=FIRST_COMPLETED)
+                for vol, futures in list(active.items()):
+                    if all(f.done() for f in futures):
+                        del active[vol]
+                        yield self._volume_data(vol, [f.result() for f in futures])
+
+    def _run_async_iterator(self, aiterator: AsyncIterator) -> Iterator:
+        """
+        Iterate an async generator from synchronous code
+
+        The event loop only runs while the next item is being awaited,
+        the requests themselves continue in the scheduler's threads.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(aiterator.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(aiterator.aclose())  # type: ignore
+            loop.close()
+
+    async def _aiter_volumes_data(
+        self, volumes: List[int]
+    ) -> AsyncIterator[VolumeData]:
+        """
+        Coroutine equivalent of _iter_volumes_data
+
+        The parsers are blocking, so each request is handed to the
+        scheduler and its future awaited rather than blocking the loop.
+        """
+        with Scheduler() as scheduler:
+            budget = self.budget
+            pending = deque(volumes)
+            active: Dict[asyncio.Future, int] = {}
+            while pending or active:
+                slots = self.pipeline_depth - len(active)
+                url_futures = self._admit_volumes(scheduler, pending, slots)
+                all_urls = await asyncio.gather(
+                    *(asyncio.wrap_future(f) for f in url_futures.values())
+                )
+                admitted: Dict[int, List[Tuple[int, str]]] = {}
+                for vol, page_urls in zip(url_futures, all_urls):
+                    if page_urls is None:
+                        yield (vol, None)
+                    else:
+                        admitted[vol] = page_urls
+                futures = self._schedule_pages(scheduler, admitted, budget)
+                for vol, vol_futures in futures.items():
+                    pages = [asyncio.wrap_future(f) for f in vol_futures]
+                    active[asyncio.gather(*pages)] = vol
+                if not active:
+                    continue
+                done, _ = await asyncio.wait(
+                    list(active), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    vol = active.pop(task)
+                    yield self._volume_data(vol, list(task.result()))
+
+    def _add_saved_volume(self, manga: Manga, volume_number: int) -> None:
+        """
+        Adds a volume already saved to disk to the manga
+        """
+        try:
+            manga.add_volume(volume_number)
+        except (VolumeAlreadyExists, VolumeAlreadyPresent) as e:
+            self.adapter.warning(e)
+
+    def iter_volumes(
         self,
+        manga: Manga,
         vol_nums: Optional[List[int]] = None,
-        filetype: str = "pdf",
-        preferred_name: Optional[str] = None,
-    ) -> Manga:
+        uploaded: Optional[Callable[[Path], bool]] = None,
+    ) -> Generator[Volume, None, None]:
         """
-        Returns a Manga object containing the requested volumes
+        Adds each requested volume to the manga & yields it once downloaded
+
+        Volumes already saved to disk are added without being downloaded.
+        Volumes that uploaded, if given, finds at their upload path are
+        neither downloaded nor added.
         """
-        volumes_data = self._get_volumes_data(vol_nums)
-        manga_name = preferred_name if preferred_name else self.parser.manga.name
-        manga = Manga(manga_name, filetype)
-        for volume_data in volumes_data:
+        volumes = vol_nums or self.parser.manga.all_volume_numbers()
+        missing = []
+        for volume_number in volumes:
+            if manga.volume_saved(volume_number):
+                self._add_saved_volume(manga, volume_number)
+            elif uploaded and manga.volume_uploaded(volume_number, uploaded):
+                self.adapter.warning(f"Volume {volume_number} already uploaded")
+            else:
+                missing.append(volume_number)
+                continue
+            # nothing is left to resume for a volume that is already done
+            self.journal(volume_number).clear()
+        for volume_data in self._iter_volumes_data(missing):
             try:
                 volume_number, pages_data = volume_data
                 if not pages_data:
@@ -219,6 +563,31 @@ class MangaBuilder:
                 manga.volume[volume_number].pages = pages_data  # type: ignore
             except (VolumeAlreadyExists, VolumeAlreadyPresent) as e:
                 self.adapter.warning(e)
+                self._release(pages_data)
+                self.journal(volume_number).clear()
                 # no need to download pages so continue
                 continue
+            yield manga.volume[volume_number]
+
+    def manga(
+        self, filetype: str = "pdf", preferred_name: Optional[str] = None
+    ) -> Manga:
+        """
+        Returns an empty Manga object to add volumes to
+        """
+        manga_name = preferred_name if preferred_name else self.parser.manga.name
+        return Manga(manga_name, filetype)
+
+    def get_manga_volumes(
+        self,
+        vol_nums: Optional[List[int]] = None,
+        filetype: str = "pdf",
+        preferred_name: Optional[str] = None,
+    ) -> Manga:
+        """
+        Returns a Manga object containing the requested volumes
+        """
+        manga = self.manga(filetype, preferred_name)
+        for _ in self.iter_volumes(manga, vol_nums):
+            pass
         return manga
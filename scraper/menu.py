@@ -1,10 +1,10 @@
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Dict, List, Optional
 
 from tabulate import tabulate
 
 from scraper.exceptions import InvalidOption
 from scraper.new_types import SearchResults
-from scraper.parsers.types import SiteParser
+from scraper.parsers.types import SearcherClass
 from scraper.utils import menu_input
 
 
@@ -20,6 +20,7 @@ class Menu:
         parent: Optional["Menu"] = None,
     ) -> None:
         self.parent: Menu = parent
+        self.choice: Optional[str] = None
         self.options: Dict[str, str] = self._add_parent_to_options(options)
         self.choices: str = self._add_back_to_choices(choices)
 
@@ -31,6 +32,7 @@ class Menu:
             print(self.choices)
             choice = menu_input()
             item = self.options[choice]
+            self.choice = choice
             return item
         except KeyError:
             raise InvalidOption(
@@ -71,8 +73,8 @@ class Menu:
 
 
 class SearchMenu(Menu):
-    def __init__(self, query: List[str], parser: Type[SiteParser]) -> None:
-        self.parser: SiteParser = parser()
+    def __init__(self, query: List[str], parser: SearcherClass) -> None:
+        self.parser = parser()
         self.search_results: SearchResults = self._search(query)
         choices: str = self.table()
         options: Dict[str, str] = self._create_options()
@@ -100,6 +102,12 @@ class SearchMenu(Menu):
         table = tabulate(data, headers=columns, tablefmt="psql")
         return table
 
+    def selected_source(self) -> str:
+        """
+        Source site of the chosen search result
+        """
+        return self.search_results[self.choice]["source"]
+
     def _create_options(self) -> Dict[str, str]:
         """
         Take number and url from search object
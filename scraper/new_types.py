@@ -2,8 +2,9 @@
 Custom type hints & aliases
 """
 
-from typing import Dict, Iterable, Optional, Tuple
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
 
-PageData = Tuple[int, bytes]
+PageData = Tuple[int, Union[bytes, Path]]
 VolumeData = Tuple[int, Optional[Iterable[PageData]]]
 SearchResults = Dict[str, Dict[str, str]]
@@ -0,0 +1,23 @@
+"""
+Parsers for each supported manga site
+"""
+
+from typing import Dict
+
+from scraper.parsers.types import SiteParserClass
+
+
+def site_parsers() -> Dict[str, SiteParserClass]:
+    """
+    Parser class of each supported site, keyed by its source name
+
+    Imported when called so importing a single parser doesn't pull in
+    the rest.
+    """
+    from scraper.parsers.mangafast import MangaFast
+    from scraper.parsers.mangareader import MangaReader
+
+    return {
+        "mangareader": MangaReader,
+        "mangafast": MangaFast,
+    }
@@ -4,15 +4,15 @@ Abstract base classes for all parsers
 import abc
 import logging
 import sys
-from functools import lru_cache
 from typing import Iterable, List, Optional, Tuple, Type
 
-import requests
 from bs4.element import Tag
 
+from scraper.cache import image_cache, normalise_query, search_cache
+from scraper.catalog import catalog
 from scraper.exceptions import MangaParserNotSet
 from scraper.new_types import SearchResults
-from scraper.utils import get_html_from_url
+from scraper.utils import get_html_from_url, get_session
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +36,18 @@ class BaseMangaParser:
     def page_data(self, page_url: Tuple[int, str]) -> Tuple[int, bytes]:
         """
         Extracts a manga pages data
+
+        Raises requests.HTTPError if the image can't be downloaded.
         """
         page_num, img_url = page_url
-        img_data = requests.get(img_url).content
+        cache = image_cache()
+        img_data = cache.get(img_url)
+        if img_data is None:
+            response = get_session().get(img_url)
+            # error pages must never be cached or journaled as images
+            response.raise_for_status()
+            img_data = response.content
+            cache.put(img_url, img_data)
         return (int(page_num), img_data)
 
     @abc.abstractmethod
@@ -114,7 +123,13 @@ class BaseSiteParser:
     def manga(self, manga_name: str) -> None:
         self._manga = self._manga_parser(manga_name, self.base_url)
 
-    @lru_cache()
     def search(self, query: str) -> SearchResults:
-        search_parser = self._search_parser(query, self.base_url)
-        return search_parser.search()
+        cache = search_cache()
+        key = f"{self.base_url} {normalise_query(query)}"
+        results = cache.get(key)
+        if results is None:
+            search_parser = self._search_parser(query, self.base_url)
+            results = search_parser.search()
+            cache.put(key, results)
+            catalog(self.base_url).add_results(results)
+        return results
@@ -1,11 +1,14 @@
 import logging
 import re
+import threading
 from typing import Dict, List, Optional, Tuple
 
 import requests
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 
+from scraper.cache import chapter_list_cache
+from scraper.catalog import catalog
 from scraper.exceptions import MangaDoesNotExist, VolumeDoesntExist
 from scraper.new_types import SearchResults
 from scraper.parsers.base import BaseMangaParser, BaseSearchParser, BaseSiteParser
@@ -17,6 +20,8 @@ logger = logging.getLogger(__name__)
 class MangaFastMangaParser(BaseMangaParser):
     def __init__(self, manga_name: str, base_url: str = "http://mangafast.net") -> None:
         super().__init__(manga_name, base_url)
+        self._volume_numbers: Optional[List[int]] = None
+        self._volume_numbers_lock = threading.Lock()
 
     def _scrape_volume(self, volume: int) -> BeautifulSoup:
         highest_volume = self.all_volume_numbers()[0]
@@ -24,7 +29,7 @@ class MangaFastMangaParser(BaseMangaParser):
             raise VolumeDoesntExist(f"Manga volume {volume} does not exist")
         try:
             volume_html = get_html_from_url(
-                f"{self.base_url}/{self.name}-chapter-{volume}"
+                f"{self.base_url}/{self.name}-chapter-{volume}", url_class="chapter"
             )
             return volume_html
         except requests.exceptions.HTTPError as e:
@@ -45,10 +50,10 @@ class MangaFastMangaParser(BaseMangaParser):
             img_urls.append((page_num, url))
         return img_urls
 
-    def all_volume_numbers(self) -> List[int]:
+    def _scrape_volume_numbers(self) -> List[int]:
         try:
             url = f"{self.base_url}/{self.name}?order=old#table"
-            manga_html = get_html_from_url(url)
+            manga_html = get_html_from_url(url, url_class="series")
             volume_tags = manga_html.find("table", id="table").find_all("a")
             volume_tags = [tag for tag in volume_tags if tag.text != "PDF"]
             volume_numbers = [
@@ -61,6 +66,26 @@ class MangaFastMangaParser(BaseMangaParser):
                 raise MangaDoesNotExist(f"Manga {self.name} does not exist")
             raise e
 
+    def all_volume_numbers(self) -> List[int]:
+        """
+        All volume numbers for a manga, highest first
+
+        The chapter list is only scraped once per parser as it is needed
+        to bounds check every volume, and is optionally cached across
+        runs for chapter_list_ttl seconds.
+        """
+        with self._volume_numbers_lock:
+            if self._volume_numbers is None:
+                cache = chapter_list_cache()
+                key = f"{self.base_url}/{self.name}"
+                volume_numbers = cache.get(key)
+                if volume_numbers is None:
+                    volume_numbers = self._scrape_volume_numbers()
+                    cache.put(key, volume_numbers)
+                    catalog(self.base_url).add(self.name, chapters=len(volume_numbers))
+                self._volume_numbers = volume_numbers
+        return list(self._volume_numbers)
+
 
 class MangaFastSearch(BaseSearchParser):
     def __init__(self, query: str, base_url: str = "https://mangafast.net") -> None:
@@ -10,13 +10,21 @@ from typing import Dict, Iterable, List, Optional, Tuple
 import requests
 from bs4 import BeautifulSoup
 from bs4.element import Tag
+from scraper.cache import http_cache
+from scraper.catalog import catalog
 from scraper.exceptions import MangaDoesNotExist, VolumeDoesntExist
 from scraper.new_types import SearchResults
 from scraper.parsers.base import BaseMangaParser, BaseSearchParser, BaseSiteParser
-from scraper.utils import get_html_from_url
+from scraper.utils import get_html_from_url, get_text_from_url
 
 logger = logging.getLogger(__name__)
 
+# JSON page metadata assigned within a chapter page's script tag
+PAGE_METADATA = re.compile(
+    r'document\["mj"\]\s*=\s*(\{.*?\})\s*;?\s*</script>', re.DOTALL
+)
+NOT_RELEASED = "not released yet"
+
 
 class MangaReaderMangaParser(BaseMangaParser):
     """
@@ -28,33 +36,74 @@ class MangaReaderMangaParser(BaseMangaParser):
     ) -> None:
         super().__init__(manga_name, base_url)
 
-    def _scrape_volume(self, volume: int) -> BeautifulSoup:
+    def _volume_url(self, volume: int) -> str:
+        return f"{self.base_url}/{self.name}/{volume}"
+
+    def _get_volume_text(self, volume: int) -> str:
         """
-        Retrieve HTML for a given manga volume number
+        Retrieve the raw HTML for a given manga volume number
         """
         try:
-            volume_html = get_html_from_url(f"{self.base_url}/{self.name}/{volume}")
-            if not volume_html.text:
-                raise MangaDoesNotExist(self.name)
-            string = re.compile(".*not released yet.*")
-            matches = volume_html.find_all(string=string, recursive=True)
-            if matches:
-                raise VolumeDoesntExist(f"Manga volume {volume} does not exist")
-            return volume_html
+            return get_text_from_url(self._volume_url(volume), url_class="chapter")
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
                 raise MangaDoesNotExist(f"Manga {self.name} does not exist")
             raise e
 
+    def _parse_volume(self, volume: int, volume_text: str) -> BeautifulSoup:
+        """
+        Parse the HTML for a given manga volume number
+        """
+        volume_html = BeautifulSoup(volume_text, features="lxml")
+        if not volume_html.text:
+            raise MangaDoesNotExist(self.name)
+        string = re.compile(".*not released yet.*")
+        matches = volume_html.find_all(string=string, recursive=True)
+        if matches:
+            raise VolumeDoesntExist(f"Manga volume {volume} does not exist")
+        return volume_html
+
+    def _scrape_volume(self, volume: int) -> BeautifulSoup:
+        """
+        Retrieve HTML for a given manga volume number
+        """
+        return self._parse_volume(volume, self._get_volume_text(volume))
+
+    def _fast_page_metadata(self, volume: int, volume_text: str) -> Optional[dict]:
+        """
+        Extract the page metadata from the raw HTML without building a DOM
+
+        Returns None if the HTML isn't laid out as expected, in which case
+        the caller should fall back to parsing it with BeautifulSoup.
+        """
+        match = PAGE_METADATA.search(volume_text)
+        if match:
+            try:
+                page_metadata = json.loads(match.group(1))
+            except ValueError:
+                return None
+            return page_metadata if "im" in page_metadata else None
+        if NOT_RELEASED in volume_text:
+            raise VolumeDoesntExist(f"Manga volume {volume} does not exist")
+        return None
+
     def page_urls(self, volume: int) -> List[Tuple[int, str]]:
         """
         Return a list of urls for every page in a given volume
         """
-        volume_html = self._scrape_volume(volume)
-        scripts = volume_html.find_all("script")
-        script = scripts[1]
-        clean_script = script.text.replace('document["mj"]=', "")
-        page_metadata = json.loads(clean_script)
+        volume_text = self._get_volume_text(volume)
+        try:
+            page_metadata = self._fast_page_metadata(volume, volume_text)
+            if page_metadata is None:
+                volume_html = self._parse_volume(volume, volume_text)
+                scripts = volume_html.find_all("script")
+                script = scripts[1]
+                clean_script = script.text.replace('document["mj"]=', "")
+                page_metadata = json.loads(clean_script)
+        except (MangaDoesNotExist, VolumeDoesntExist):
+            # unreleased chapters will change so shouldn't stay cached
+            http_cache().invalidate(self._volume_url(volume))
+            raise
         image_urls = [(int(x["p"]), "https:" + x["u"]) for x in page_metadata["im"]]
         return image_urls
 
@@ -64,11 +113,12 @@ class MangaReaderMangaParser(BaseMangaParser):
         """
         try:
             url = f"{self.base_url}/{self.name}"
-            manga_html = get_html_from_url(url)
+            manga_html = get_html_from_url(url, url_class="series")
             volume_tags = manga_html.find("div", id="chapterlist").find_all("a")
             volume_numbers = [
                 int(vol.get("href").split("/")[-1]) for vol in volume_tags
             ]
+            catalog(self.base_url).add(self.name, chapters=len(volume_numbers))
             return volume_numbers
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
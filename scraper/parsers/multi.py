@@ -0,0 +1,68 @@
+"""
+Search every supported site at once
+"""
+
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional
+
+from scraper.new_types import SearchResults
+from scraper.parsers import site_parsers
+from scraper.parsers.types import SiteParser
+from scraper.utils import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AllSources:
+    """
+    Searches each site concurrently & merges their results
+
+    Sites that fail, or don't answer within the search_timeout, are
+    left out so the results are only ever as slow as the slowest
+    healthy site.
+    """
+
+    def __init__(self, manga_name: Optional[str] = None) -> None:
+        self.sites = [parser() for parser in site_parsers().values()]
+
+    @staticmethod
+    def _search_site(site: SiteParser, query: str) -> SearchResults:
+        try:
+            return site.search(query)
+        except SystemExit:
+            # a site without results exits, which is fine if another has some
+            return {}
+
+    def search(self, query: str) -> SearchResults:
+        timeout = float(settings()["config"].get("search_timeout", 10))
+        executor = ThreadPoolExecutor(max_workers=len(self.sites))
+        futures = [
+            executor.submit(self._search_site, site, query) for site in self.sites
+        ]
+        done, not_done = wait(futures, timeout=timeout)
+        # searches already running can't be interrupted, they finish in the
+        # background & their results are dropped
+        for future in not_done:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+        results: SearchResults = {}
+        for site, future in zip(self.sites, futures):
+            name = type(site).__name__
+            if future not in done:
+                logger.warning(f"{name} search took longer than {timeout}s, skipping")
+                continue
+            try:
+                site_results = future.result()
+            except Exception as e:
+                logger.warning(f"{name} search failed: {e}")
+                continue
+            for metadata in site_results.values():
+                results[str(len(results) + 1)] = metadata
+
+        if not results:
+            logger.warning(f"No search results found for {query}\nExiting...")
+            sys.exit()
+        return results
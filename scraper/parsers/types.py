@@ -1,22 +1,39 @@
-from typing import Type, Union
+from typing import TYPE_CHECKING, Type, Union
 
-from scraper.parsers.mangakaka import MangaKaka, MangaKakaMangaParser, MangaKakaSearch
-from scraper.parsers.mangafast import MangaFast, MangaFastMangaParser, MangaFastSearch
-from scraper.parsers.mangareader import (
-    MangaReader,
-    MangaReaderMangaParser,
-    MangaReaderSearch,
-)
+# the parsers are only imported for type checking so importing these
+# aliases doesn't pull in bs4 & lxml
+if TYPE_CHECKING:
+    from scraper.parsers.mangakaka import (
+        MangaKaka,
+        MangaKakaMangaParser,
+        MangaKakaSearch,
+    )
+    from scraper.parsers.mangafast import (
+        MangaFast,
+        MangaFastMangaParser,
+        MangaFastSearch,
+    )
+    from scraper.parsers.mangareader import (
+        MangaReader,
+        MangaReaderMangaParser,
+        MangaReaderSearch,
+    )
+    from scraper.parsers.multi import AllSources
 
-MangaParser = Union[MangaReaderMangaParser, MangaKakaMangaParser, MangaFastMangaParser]
-SearchParser = Union[MangaReaderSearch, MangaKakaSearch, MangaFastSearch]
-SiteParser = Union[MangaReader, MangaKaka, MangaFast]
+MangaParser = Union[
+    "MangaReaderMangaParser", "MangaKakaMangaParser", "MangaFastMangaParser"
+]
+SearchParser = Union["MangaReaderSearch", "MangaKakaSearch", "MangaFastSearch"]
+SiteParser = Union["MangaReader", "MangaKaka", "MangaFast"]
 
 
 MangaParserClass = Union[
-    Type[MangaReaderMangaParser], Type[MangaKakaMangaParser], Type[MangaFastMangaParser]
+    Type["MangaReaderMangaParser"],
+    Type["MangaKakaMangaParser"],
+    Type["MangaFastMangaParser"],
 ]
 SearchParserClass = Union[
-    Type[MangaReaderSearch], Type[MangaKakaSearch], Type[MangaFastSearch]
+    Type["MangaReaderSearch"], Type["MangaKakaSearch"], Type["MangaFastSearch"]
 ]
-SiteParserClass = Union[Type[MangaReader], Type[MangaKaka], Type[MangaFast]]
+SiteParserClass = Union[Type["MangaReader"], Type["MangaKaka"], Type["MangaFast"]]
+SearcherClass = Union[SiteParserClass, Type["AllSources"]]
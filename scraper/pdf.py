@@ -0,0 +1,159 @@
+"""
+Writes PDFs that embed JPEG pages without decoding them
+"""
+
+import struct
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from scraper.exceptions import UnsupportedImage
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# start of frame markers, which hold the dimensions of a JPEG
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7}
+SOF_MARKERS |= {0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+COLOUR_SPACES = {1: "/DeviceGray", 3: "/DeviceRGB"}
+
+
+def jpeg_info(data: bytes) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Width, height, bits per component & components of a JPEG
+
+    Only the segment headers are read, the image is never decoded.
+    Returns None if data is not a JPEG.
+    """
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # padding before a marker
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # standalone markers have no length
+            i += 2
+            continue
+        if marker in SOF_MARKERS:
+            bits = data[i + 4]
+            height, width = struct.unpack(">HH", data[i + 5 : i + 9])
+            return width, height, bits, data[i + 9]
+        (length,) = struct.unpack(">H", data[i + 2 : i + 4])
+        i += 2 + length
+    return None
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Width & height of a JPEG or PNG read from its header
+    """
+    info = jpeg_info(data)
+    if info:
+        return info[0], info[1]
+    if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+    return None
+
+
+def check_jpeg(img: bytes) -> Tuple[int, int, int, int]:
+    """
+    JPEG info of img, raising UnsupportedImage if it can't be passed through
+    """
+    info = jpeg_info(img)
+    if not info or info[2] != 8 or info[3] not in COLOUR_SPACES:
+        raise UnsupportedImage("Only 8 bit greyscale or RGB JPEGs are supported")
+    return info
+
+
+class JpegPdfWriter:
+    """
+    Streams JPEGs into a PDF, one image per page
+
+    Each JPEG is embedded verbatim with the DCTDecode filter so pages
+    keep their exact quality. Raises UnsupportedImage for anything that
+    can't be passed through as is, e.g. PNG or CMYK JPEGs.
+    """
+
+    def __init__(self, sink: BinaryIO) -> None:
+        self.sink: BinaryIO = sink
+        self.position: int = 0
+        # catalog & page tree are objects 1 and 2
+        self.offsets: List[int] = [0, 0]
+        self.pages: List[int] = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes) -> None:
+        self.sink.write(data)
+        self.position += len(data)
+
+    def _object(self, body: bytes, stream: Optional[bytes] = None) -> int:
+        self.offsets.append(self.position)
+        number = len(self.offsets)
+        self._write_object(number, body, stream)
+        return number
+
+    def _write_object(
+        self, number: int, body: bytes, stream: Optional[bytes] = None
+    ) -> None:
+        self._write(b"%d 0 obj\n" % number + body)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_page(self, img: bytes) -> None:
+        """
+        Add a page the size of the JPEG img
+        """
+        width, height, bits, components = check_jpeg(img)
+        image = self._object(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace %s /BitsPerComponent %d /Filter /DCTDecode "
+            b"/Length %d >>"
+            % (width, height, COLOUR_SPACES[components].encode(), bits, len(img)),
+            img,
+        )
+        content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (width, height)
+        contents = self._object(b"<< /Length %d >>" % len(content), content)
+        page = self._object(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+            % (width, height, image, contents)
+        )
+        self.pages.append(page)
+
+    def close(self) -> None:
+        """
+        Write the page tree, catalog & cross reference table
+        """
+        kids = b" ".join(b"%d 0 R" % page for page in self.pages)
+        self.offsets[1] = self.position
+        self._write_object(
+            2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages))
+        )
+        self.offsets[0] = self.position
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        for offset in self.offsets:
+            self._write(b"%010d 00000 n \n" % offset)
+        self._write(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(self.offsets) + 1, xref)
+        )
+
+
+def write_jpeg_pdf(pages: Iterable[bytes], sink: BinaryIO) -> None:
+    """
+    Write JPEG page images to sink as a PDF
+    """
+    writer = JpegPdfWriter(sink)
+    for img in pages:
+        writer.add_page(img)
+    writer.close()
@@ -0,0 +1,85 @@
+"""
+Streams converted volumes between processes without touching the disk
+"""
+
+import io
+from multiprocessing.connection import Connection
+
+# largest message sent, which bounds the memory a stream holds
+CHUNK_SIZE = 1024 * 1024
+
+
+class PipeWriter(io.RawIOBase):
+    """
+    Sends everything written as messages over a Connection
+
+    An empty message marks the end of the stream. Without it the
+    reader treats the stream as incomplete, e.g. if the conversion
+    failed part way through. Wrap in an io.BufferedWriter of
+    CHUNK_SIZE so small writes are sent together.
+    """
+
+    def __init__(self, connection: Connection) -> None:
+        self.connection: Connection = connection
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        # empty messages are reserved for the end of the stream
+        if data:
+            self.connection.send_bytes(data)
+        return len(data)
+
+    def finish(self) -> None:
+        """
+        Mark the stream as complete, once everything has been flushed
+        """
+        self.connection.send_bytes(b"")
+
+    def close(self) -> None:
+        self.connection.close()
+        super().close()
+
+
+class PipeReader(io.RawIOBase):
+    """
+    Reads the messages sent by a PipeWriter as one stream
+
+    Raises IOError if the writer closed its end without finishing.
+    """
+
+    def __init__(self, connection: Connection) -> None:
+        self.connection: Connection = connection
+        self._chunk: memoryview = memoryview(b"")
+        self._finished: bool = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk and not self._finished:
+            try:
+                self._chunk = memoryview(self.connection.recv_bytes())
+            except EOFError:
+                raise IOError("Stream closed before the volume was converted")
+            self._finished = not self._chunk
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def drain(self) -> None:
+        """
+        Discard the rest of the stream so the writer is never left blocked
+        """
+        buffer = bytearray(CHUNK_SIZE)
+        try:
+            while self.readinto(buffer):
+                pass
+        except IOError:
+            pass
+
+    def close(self) -> None:
+        self.connection.close()
+        super().close()
@@ -0,0 +1,121 @@
+"""
+Schedules chapter & page fetches for every volume in a download
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import zip_longest
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import urlparse
+
+from scraper.utils import concurrency_limits
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+Job = Tuple[Future, Callable, Tuple[Any, ...]]
+
+
+def interleave(jobs: Dict[K, List[V]]) -> Iterator[Tuple[K, V]]:
+    """
+    Round robin over each key's values so that no key is starved
+
+    >>> list(interleave({1: ["a", "b"], 2: ["c"]}))
+    [(1, 'a'), (2, 'c'), (1, 'b')]
+    """
+    keyed = [[(key, value) for value in values] for key, values in jobs.items()]
+    for row in zip_longest(*keyed):
+        for job in row:
+            if job is not None:
+                yield job
+
+
+class Scheduler:
+    """
+    Runs fetches on one thread pool with a total & per host limit
+
+    A single scheduler should be shared by every volume being downloaded
+    so the number of open connections is independent of the core count.
+    """
+
+    def __init__(
+        self, max_connections: Optional[int] = None, max_per_host: Optional[int] = None
+    ) -> None:
+        default_connections, default_per_host = concurrency_limits()
+        self.max_connections: int = max_connections or default_connections
+        self.max_per_host: int = max_per_host or default_per_host
+        self._executor = ThreadPoolExecutor(max_workers=self.max_connections)
+        # fetches running per host & those waiting for one of its slots
+        self._active: Dict[str, int] = {}
+        self._pending: Dict[str, Deque[Job]] = {}
+        self._idle = threading.Condition()
+
+    def __enter__(self) -> "Scheduler":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    def submit(self, url: str, func: Callable, *args: Any) -> Future:
+        """
+        Schedule func(*args), which requests the given url
+
+        Fetches for a host at its limit wait in a queue rather than in
+        the pool, so they never hold a thread another host could use.
+        """
+        host = urlparse(url).netloc or url
+        job: Job = (Future(), func, args)
+        with self._idle:
+            if self._active.get(host, 0) < self.max_per_host:
+                self._active[host] = self._active.get(host, 0) + 1
+            else:
+                self._pending.setdefault(host, deque()).append(job)
+                return job[0]
+        self._dispatch(host, job)
+        return job[0]
+
+    def _dispatch(self, host: str, job: Job) -> None:
+        future, func, args = job
+        if not future.set_running_or_notify_cancel():
+            self._release(host)
+            return None
+
+        def task() -> None:
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._release(host)
+
+        self._executor.submit(task)
+
+    def _release(self, host: str) -> None:
+        """
+        Hands a finished fetch's host slot to the next fetch waiting on it
+        """
+        with self._idle:
+            pending = self._pending.get(host)
+            if pending:
+                job = pending.popleft()
+            else:
+                self._active[host] -= 1
+                self._idle.notify_all()
+                return None
+        self._dispatch(host, job)
+
+    def shutdown(self) -> None:
+        with self._idle:
+            self._idle.wait_for(lambda: not any(self._active.values()))
+        self._executor.shutdown(wait=True)
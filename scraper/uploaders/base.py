@@ -1,8 +1,10 @@
 import abc
 import logging
-from configparser import SectionProxy
+import threading
+from contextlib import contextmanager
 from multiprocessing.pool import ThreadPool
-from typing import Any, List, Optional
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Mapping, Optional, Set
 
 from scraper.manga import Manga, Volume
 from scraper.utils import CustomAdapter, get_adapter, settings
@@ -15,11 +17,21 @@ class BaseUploader:
     Base class for uploading to cloud storage services
     """
 
+    # whether upload_volume can read a volume from a stream, e.g. one
+    # being converted with --diskless, rather than a saved file
+    streams: bool = False
+
     def __init__(self, service: str) -> None:
         self.service: str = service
-        self.config: SectionProxy = self._get_config()
+        self.config: Mapping[str, str] = self._get_config()
         self.api: Any = self._get_api_object()
         self.adapter: Optional[CustomAdapter] = None
+        self._listings: Dict[Path, Optional[Dict[str, int]]] = {}
+        # one lock per directory so different directories list at once
+        self._listing_locks: Dict[Path, threading.Lock] = {}
+        self._listings_lock = threading.Lock()
+        self._prepared: Set[str] = set()
+        self._prepare_lock = threading.Lock()
 
     def _get_config(self):
         return settings()[self.service]
@@ -35,23 +47,101 @@ class BaseUploader:
         pass
 
     @abc.abstractmethod
-    def upload_volume(self, volume: Volume) -> Any:
+    def upload_volume(self, volume: Volume, file: Optional[BinaryIO] = None) -> Any:
         """
-        Uploads a given volume
+        Uploads a given volume, read from file if it was never saved
+
+        file may be an unseekable stream if the uploader streams.
         """
         pass
 
+    @contextmanager
+    def open_volume(
+        self, volume: Volume, file: Optional[BinaryIO] = None
+    ) -> Iterator[BinaryIO]:
+        """
+        Opens the saved volume, unless its file is already in hand
+        """
+        if file is not None:
+            yield file
+        else:
+            with open(volume.file_path, "rb") as saved:
+                yield saved
+
+    def list_directory(self, directory: Path) -> Optional[Dict[str, int]]:
+        """
+        Name & size of each file in a remote directory
+
+        Returns None if the service can't list directories, in which
+        case each volume has to be looked up individually.
+        """
+        return None
+
+    def remote_files(self, directory: Path) -> Optional[Dict[str, int]]:
+        """
+        Listing of a remote directory, fetched once per uploader
+
+        Threads asking for the same directory wait on a single request.
+        """
+        with self._listings_lock:
+            lock = self._listing_locks.setdefault(directory, threading.Lock())
+        with lock:
+            if directory not in self._listings:
+                self._listings[directory] = self.list_directory(directory)
+            return self._listings[directory]
+
+    def uploaded(self, path: Path) -> bool:
+        """
+        Whether a file is listed at path
+
+        False if the service can't list directories, so callers fall
+        back to checking as each volume is uploaded.
+        """
+        listing = self.remote_files(path.parent)
+        return listing is not None and path.name in listing
+
     def _setup_adapter(self, manga: Manga) -> None:
         self.adapter = get_adapter(logger, manga.name)
 
-    def upload(self, manga: Manga) -> List[Any]:
+    def prepare(self, manga: Manga) -> None:
         """
-        Uploads all volumes in a given Manga object
+        Sets up for uploading the volumes of a manga
         """
-        if not manga.volumes:
-            return None
         self._setup_adapter(manga)
-        self.adapter.info(f"Uploading to {self.service.title()}")
+
+    def _prepare_once(self, manga: Manga) -> None:
+        with self._prepare_lock:
+            if manga.name not in self._prepared:
+                self.prepare(manga)
+                self.adapter.info(f"Uploading to {self.service.title()}")
+                self._prepared.add(manga.name)
+
+    def upload_saved_volume(
+        self,
+        manga: Manga,
+        volume: Volume,
+        file: Optional[BinaryIO] = None,
+        remove: bool = False,
+    ) -> Any:
+        """
+        Uploads a volume as soon as it has been saved, or converted to file
+
+        The local file is deleted once uploaded if remove is True.
+        """
+        self._prepare_once(manga)
+        response = self.upload_volume(volume, file)
+        if remove and file is None:
+            volume.file_path.unlink()
+        return response
+
+    def upload(self, manga: Manga, volumes: Optional[List[Volume]] = None) -> List[Any]:
+        """
+        Uploads all volumes, or the given volumes, of a Manga object
+        """
+        volumes = manga.volumes if volumes is None else volumes
+        if not volumes:
+            return None
+        self._prepare_once(manga)
         with ThreadPool() as pool:
-            responses = pool.map(self.upload_volume, manga.volumes)
+            responses = pool.map(self.upload_volume, volumes)
         return responses
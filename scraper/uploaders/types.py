@@ -1,5 +1,10 @@
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
-from scraper.uploaders.uploaders import DropboxUploader, MegaUploader, PcloudUploader
+if TYPE_CHECKING:
+    from scraper.uploaders.uploaders import (
+        DropboxUploader,
+        MegaUploader,
+        PcloudUploader,
+    )
 
-Uploader = Union[DropboxUploader, MegaUploader, PcloudUploader]
+Uploader = Union["DropboxUploader", "MegaUploader", "PcloudUploader"]
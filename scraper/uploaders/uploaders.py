@@ -1,9 +1,11 @@
 import logging
+import os
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional, Set
 
 import dropbox
-from dropbox.files import FileMetadata
+from dropbox.files import CommitInfo, FileMetadata, UploadSessionCursor
 from mega import Mega
 from pcloud import PyCloud
 
@@ -18,13 +20,36 @@ class DropboxUploader(BaseUploader):
     Uploads manga volumes to Dropbox
     """
 
+    streams = True
+
     def __init__(self) -> None:
         super().__init__(service="dropbox")
+        megabytes = int(self.config.get("chunk_size", 8))
+        self.chunk_size: int = megabytes * 1024 * 1024
 
     def _get_api_object(self) -> dropbox.Dropbox:
         return dropbox.Dropbox(self.config["token"])
 
+    def list_directory(self, directory: Path) -> Optional[Dict[str, int]]:
+        try:
+            result = self.api.files_list_folder(str(directory))
+        except dropbox.exceptions.ApiError as e:
+            if "not_found" in str(e.error._value):
+                return {}
+            raise e
+        files: Dict[str, int] = {}
+        while True:
+            for entry in result.entries:
+                if isinstance(entry, FileMetadata):
+                    files[entry.name] = entry.size
+            if not result.has_more:
+                return files
+            result = self.api.files_list_folder_continue(result.cursor)
+
     def volume_exists(self, volume: Volume) -> bool:
+        listing = self.remote_files(volume.upload_path.parent)
+        if listing is not None:
+            return volume.upload_path.name in listing
         try:
             volume_search = self.api.files_search(
                 path=str(volume.upload_path.parent), query=str(volume.upload_path.name),
@@ -36,15 +61,46 @@ class DropboxUploader(BaseUploader):
                 return False
             raise e
 
-    def upload_volume(self, volume: Volume) -> Optional[FileMetadata]:
+    def upload_volume(
+        self, volume: Volume, file: Optional[BinaryIO] = None
+    ) -> Optional[FileMetadata]:
         if self.volume_exists(volume):
             self.adapter.warning(f"Volume {volume.number} already exists in Dropbox")
             return None
-        with open(volume.file_path, "rb") as cbz:
-            response = self.api.files_upload(cbz.read(), str(volume.upload_path))
+        with self.open_volume(volume, file) as cbz:
+            # the size of a stream isn't known until it ends
+            size = None
+            if cbz.seekable():
+                size = cbz.seek(0, os.SEEK_END)
+                cbz.seek(0)
+            if size is not None and size <= self.chunk_size:
+                response = self.api.files_upload(cbz.read(), str(volume.upload_path))
+            else:
+                response = self.upload_session(cbz, str(volume.upload_path))
             self.adapter.info(f"Uploaded to {response.path_lower}")
             return response
 
+    def upload_session(self, file: BinaryIO, path: str) -> FileMetadata:
+        """
+        Uploads a file in chunks so only one chunk is held in memory
+
+        Files over 150MB, or streams of unknown size, can only be uploaded
+        this way.
+        """
+        chunk = file.read(self.chunk_size)
+        session = self.api.files_upload_session_start(chunk)
+        cursor = UploadSessionCursor(session_id=session.session_id, offset=len(chunk))
+        chunk = file.read(self.chunk_size)
+        while True:
+            next_chunk = file.read(self.chunk_size)
+            if not next_chunk:
+                return self.api.files_upload_session_finish(
+                    chunk, cursor, CommitInfo(path=path)
+                )
+            self.api.files_upload_session_append_v2(chunk, cursor)
+            cursor.offset += len(chunk)
+            chunk = next_chunk
+
 
 class MegaUploader(BaseUploader):
     """
@@ -73,8 +129,28 @@ class MegaUploader(BaseUploader):
         else:
             self.dirname = dir_metadata[0]
 
-    def upload_volume(self, volume: Volume) -> Optional[Dict[str, Any]]:
-        if self.api.find(volume.file_path.name):
+    def list_directory(self, directory: Path) -> Optional[Dict[str, int]]:
+        # Mega identifies directories by node rather than path, so the
+        # node is looked up as the directory may not be prepared yet
+        dir_metadata = self.api.find(directory)
+        if not dir_metadata:
+            return {}
+        files = self.api.get_files_in_node(dir_metadata[0])
+        return {node["a"]["n"]: node.get("s", 0) for node in files.values()}
+
+    def volume_exists(self, volume: Volume) -> bool:
+        listing = self.remote_files(volume.upload_path.parent)
+        if listing is not None:
+            return volume.file_path.name in listing
+        return bool(self.api.find(volume.file_path.name))
+
+    def upload_volume(
+        self, volume: Volume, file: Optional[BinaryIO] = None
+    ) -> Optional[Dict[str, Any]]:
+        # the Mega client only uploads files from a path
+        if file is not None:
+            raise IOError("Mega can only upload volumes saved to disk")
+        if self.volume_exists(volume):
             self.adapter.warning(f"Volume {volume.number} already exists in Mega")
             return None
         response = self.api.upload(
@@ -85,10 +161,9 @@ class MegaUploader(BaseUploader):
         self.adapter.info(f"Volume {volume.number} uploaded to {volume.upload_path}")
         return response
 
-    def upload(self, manga: Manga) -> List[Optional[Dict[str, Any]]]:
-        self._setup_adapter(manga)
+    def prepare(self, manga: Manga) -> None:
+        super().prepare(manga)
         self.set_dirname(manga)
-        return super().upload(manga)
 
 
 class PcloudUploader(BaseUploader):
@@ -98,6 +173,10 @@ class PcloudUploader(BaseUploader):
 
     def __init__(self) -> None:
         super().__init__(service="pcloud")
+        # directories known to exist, guarded so only one thread
+        # lists or creates a given directory
+        self._directories: Set[Path] = set()
+        self._directories_lock = threading.Lock()
 
     def _get_api_object(self) -> PyCloud:
         return PyCloud(self.config["email"], self.config["password"])
@@ -114,28 +193,51 @@ class PcloudUploader(BaseUploader):
                 return response
         return {}
 
+    def list_directory(self, directory: Path) -> Optional[Dict[str, int]]:
+        res = self.api.listfolder(path=str(directory))
+        if res.get("error"):
+            # 2005 means the directory doesn't exist yet
+            return {} if res.get("result") == 2005 else None
+        return {
+            entry["name"]: entry.get("size", 0)
+            for entry in res["metadata"].get("contents", [])
+            if not entry.get("isfolder")
+        }
+
     def create_directories_recursively(self, filename: Path) -> List[Dict[str, Any]]:
         """
         Splits a path up and creates each subdirectory down the path tree
+
+        Directories already listed or created by this uploader are skipped.
         """
         responses: List[Dict[str, Any]] = []
-        for i in reversed(range(1, len(filename.parts) - 1)):
-            directory = filename.parents[i - 1]
-            res = self.create_directory(str(directory))
-            if res.get("error"):
-                raise IOError(res.get("error"))
-            responses.append(res)
+        with self._directories_lock:
+            for i in reversed(range(1, len(filename.parts) - 1)):
+                directory = filename.parents[i - 1]
+                if directory in self._directories:
+                    continue
+                res = self.create_directory(str(directory))
+                if res.get("error"):
+                    raise IOError(res.get("error"))
+                self._directories.add(directory)
+                responses.append(res)
         return responses
 
-    def upload_volume(self, volume: Volume) -> Dict[str, Any]:
+    def upload_volume(
+        self, volume: Volume, file: Optional[BinaryIO] = None
+    ) -> Dict[str, Any]:
+        # the pCloud client streams files from a path, but only takes
+        # anything else as bytes in memory
+        if file is not None:
+            raise IOError("pCloud can only upload volumes saved to disk")
         self.create_directories_recursively(volume.upload_path)
         parent_dir = str(volume.upload_path.parent)
-        response = self.api.uploadfile(
-            data=volume.file_path.read_bytes(),
-            filename=str(volume.upload_path),
-            path=parent_dir,
-        )
+        response = self.api.uploadfile(files=[str(volume.file_path)], path=parent_dir)
         if response.get("error"):
             raise IOError(response.get("error"))
         self.adapter.info(f"Volume {volume.number} uploaded to {volume.upload_path}")
         return response
+
+    def prepare(self, manga: Manga) -> None:
+        super().prepare(manga)
+        self.create_directories_recursively(manga.volumes[0].upload_path)
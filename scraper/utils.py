@@ -1,23 +1,52 @@
 import configparser
 import functools
 import logging
+import os
 import pdb
 import re
 import sys
+import threading
 import time
 from logging import Logger, LoggerAdapter
 from pathlib import Path
-from typing import Any, Callable, MutableMapping, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
-import bs4
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from scraper.exceptions import CannotExtractChapter
 
+if TYPE_CHECKING:
+    import bs4
+
 logger = logging.getLogger(__name__)
 
+_SESSION: Optional[requests.Session] = None
+_SESSION_PID: Optional[int] = None
+_SESSION_LOCK = threading.Lock()
+
+ENV_PREFIX = "MANGASCRAPER_"
+# seconds between checks of whether the settings file has changed
+SETTINGS_CHECK_INTERVAL = 1.0
+Settings = Mapping[str, Mapping[str, str]]
+_SETTINGS: Optional[Settings] = None
+_SETTINGS_KEY: Optional[Tuple[Path, int]] = None
+_SETTINGS_CHECKED = 0.0
+_SETTINGS_LOCK = threading.Lock()
+_OVERRIDES: Dict[str, str] = {}
+
 
 class CustomAdapter(LoggerAdapter):
     """
@@ -44,13 +73,31 @@ def get_adapter(
     return CustomAdapter(logger, extra)
 
 
-def get_html_from_url(url: str) -> bs4.BeautifulSoup:
+def get_text_from_url(url: str, url_class: Optional[str] = None) -> str:
     """
-    Download the HTML text from a given url
+    Download the raw text from a given url
+
+    Responses for a url_class (series or chapter) are kept in the HTTP
+    cache and revalidated once they are older than the classes ttl.
     """
-    req = requests.get(url)
+    if url_class:
+        # imported here as the cache module depends on this one
+        from scraper.cache import http_cache
+
+        return http_cache().fetch(url, url_class)
+    req = get_session().get(url)
     req.raise_for_status()
-    html = bs4.BeautifulSoup(req.text, features="lxml")
+    return req.text
+
+
+def get_html_from_url(url: str, url_class: Optional[str] = None) -> "bs4.BeautifulSoup":
+    """
+    Download the HTML text from a given url
+    """
+    # bs4 & lxml are slow to import and not needed by every command
+    import bs4
+
+    html = bs4.BeautifulSoup(get_text_from_url(url, url_class), features="lxml")
     return html
 
 
@@ -93,16 +140,64 @@ def create_base_config() -> None:
         config.write(cf)
 
 
-def settings() -> configparser.ConfigParser:
+def override_settings(**values: str) -> None:
     """
-    Retrieve settings file contents
+    Override [config] values for the rest of the process, e.g. from the CLI
     """
-    config = configparser.ConfigParser()
+    global _SETTINGS
+    with _SETTINGS_LOCK:
+        _OVERRIDES.update(values)
+        _SETTINGS = None
+
+
+def settings() -> Settings:
+    """
+    Retrieve settings file contents as a read-only mapping of sections
+
+    The file is checked for changes at most every SETTINGS_CHECK_INTERVAL
+    seconds and only parsed again once its modification time changes.
+    [config] values can be overridden with MANGASCRAPER_<KEY> environment
+    variables, which in turn are overridden by override_settings.
+    """
+    global _SETTINGS, _SETTINGS_KEY, _SETTINGS_CHECKED
     user_config = Path.home() / ".config" / "mangascraper.ini"
-    if not user_config.exists():
-        create_base_config()
+    now = time.monotonic()
+    with _SETTINGS_LOCK:
+        if (
+            _SETTINGS is not None
+            and _SETTINGS_KEY is not None
+            and _SETTINGS_KEY[0] == user_config
+            and now - _SETTINGS_CHECKED < SETTINGS_CHECK_INTERVAL
+        ):
+            return _SETTINGS
+        if not user_config.exists():
+            create_base_config()
+        key = (user_config, user_config.stat().st_mtime_ns)
+        if _SETTINGS is None or _SETTINGS_KEY != key:
+            _SETTINGS, _SETTINGS_KEY = _read_settings(user_config), key
+        _SETTINGS_CHECKED = now
+        return _SETTINGS
+
+
+def _read_settings(user_config: Path) -> Settings:
+    """
+    Parse the settings file & apply any overrides
+    """
+    config = configparser.ConfigParser()
     config.read(str(user_config))
-    return config
+    if not config.has_section("config"):
+        config.add_section("config")
+    for name, value in os.environ.items():
+        if name.startswith(ENV_PREFIX) and len(name) > len(ENV_PREFIX):
+            config["config"][name[len(ENV_PREFIX) :].lower()] = value
+    for option, value in _OVERRIDES.items():
+        config["config"][option] = value
+    return MappingProxyType(
+        {
+            section: MappingProxyType(dict(config[section]))
+            for section in config.sections()
+        }
+    )
 
 
 def extract_chapter_number(chapter_string: str) -> str:
@@ -128,21 +223,64 @@ def extract_chapter_number(chapter_string: str) -> str:
     return chapter_number
 
 
-def request_session(max_attempts: int = 10, intervals: float = 0.2) -> requests.Session:
+def cache_directory() -> Path:
+    """
+    Directory holding persistent caches
+    """
+    default = Path.home() / ".cache" / "mangascraper"
+    return Path(settings()["config"].get("cache_directory", str(default)))
+
+
+def concurrency_limits() -> Tuple[int, int]:
+    """
+    Total & per host number of simultaneous requests
+    """
+    config = settings()["config"]
+    cpus = os.cpu_count() or 1
+    max_connections = int(config.get("max_connections", cpus * 4))
+    max_per_host = int(config.get("max_connections_per_host", cpus))
+    return max_connections, max_per_host
+
+
+def request_session(
+    max_attempts: int = 10, intervals: float = 0.2, pool_size: Optional[int] = None
+) -> requests.Session:
     """
     Requests session with custom max reattempts and time intervals
 
+    pool_size is the number of keep-alive connections held open per
+    host and defaults to the number of requests allowed per host.
+
     Usage:
       req = request_session()
       req.get(<url>)
     """
+    pool_size = pool_size or concurrency_limits()[1]
     req = requests.Session()
     retries = Retry(total=max_attempts, backoff_factor=intervals)
     for protocol in ["http", "https"]:
-        req.mount(f"{protocol}://", HTTPAdapter(max_retries=retries))
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retries)
+        req.mount(f"{protocol}://", adapter)
     return req
 
 
+def get_session() -> requests.Session:
+    """
+    Returns the pooled session shared by every request in this process
+
+    A new session is created after a fork as sockets can't be shared
+    between a parent process and its children.
+    """
+    global _SESSION, _SESSION_PID
+    pid = os.getpid()
+    if _SESSION is None or _SESSION_PID != pid:
+        with _SESSION_LOCK:
+            if _SESSION is None or _SESSION_PID != pid:
+                _SESSION = request_session()
+                _SESSION_PID = pid
+    return _SESSION
+
+
 def menu_input(msg="", prompt=">> "):
     """
     Custom input with error handeling
@@ -9,8 +9,11 @@ from unittest import mock
 import pytest
 from bs4 import BeautifulSoup
 
+from scraper.cache import chapter_list_cache, http_cache, image_cache, search_cache
+from scraper.catalog import catalog
 from scraper.manga import Manga, Page, Volume
 from scraper.menu import Menu
+from scraper.utils import override_settings
 from tests.helpers import MockedMangaReaderParser, get_bs4_tree, get_images
 
 
@@ -67,8 +70,35 @@ def mocked_manga_env_var_cli():
         "upload_root": "/",
     }
 
-    with mock.patch("scraper.__main__.CONFIG", mock_settings) as mocked_settings:
-        yield mocked_settings
+    with mock.patch("scraper.__main__.cli_config", return_value=mock_settings):
+        yield mock_settings
+
+
+@pytest.fixture(autouse=True)
+def mocked_cache_directory(tmp_path_factory):
+    """
+    Give every test its own empty cache, outside of the users home directory
+    """
+    cache_dir = tmp_path_factory.mktemp("cache")
+    caches = (image_cache, chapter_list_cache, http_cache, search_cache, catalog)
+    for cache in caches:
+        cache.cache_clear()
+    with mock.patch("scraper.cache.cache_directory", return_value=cache_dir):
+        with mock.patch("scraper.journal.cache_directory", return_value=cache_dir):
+            with mock.patch("scraper.catalog.cache_directory", return_value=cache_dir):
+                yield cache_dir
+    for cache in caches:
+        cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_settings_overrides():
+    """
+    Stop CLI options overriding the settings of later tests
+    """
+    with mock.patch.dict("scraper.utils._OVERRIDES"):
+        yield
+    override_settings()
 
 
 @pytest.fixture
@@ -177,6 +207,15 @@ def mangareader_volume_html() -> BeautifulSoup:
     return html
 
 
+@pytest.fixture
+def mangareader_volume_text() -> str:
+    """
+    Returns the raw HTML to a specfic manga volume
+    """
+    html_path = "tests/test_files/mangareader/dragonball_bardock_volume_1.html"
+    return Path(html_path).read_text()
+
+
 @pytest.fixture
 def mangakaka_volume_html() -> BeautifulSoup:
     """
@@ -207,6 +246,15 @@ def mangareader_invalid_volume_html() -> BeautifulSoup:
     return html
 
 
+@pytest.fixture
+def mangareader_invalid_volume_text() -> str:
+    """
+    Returns the raw HTML to an invalid manga volume request
+    """
+    html_path = "tests/test_files/mangareader/dragonball_bardock_volume_100.html"
+    return Path(html_path).read_text()
+
+
 @pytest.fixture
 def mangakaka_invalid_volume_html() -> BeautifulSoup:
     """
@@ -2,6 +2,7 @@ from pathlib import Path
 from unittest import mock
 
 from bs4 import BeautifulSoup
+from dropbox.files import FileMetadata
 
 from scraper.parsers.base import BaseSiteParser
 from scraper.parsers.mangafast import MangaFast, MangaFastMangaParser
@@ -74,10 +75,15 @@ class MockedImgResponse:
     Returns a mocked response with manga img as content
     """
 
+    ok = True
+
     def __init__(self):
         with open("tests/test_files/jpgs/test-manga_1_1.jpg", "rb") as f:
             self.content = f.read()
 
+    def raise_for_status(self):
+        pass
+
 
 class MockedMangaReaderParser:
     """
@@ -96,14 +102,12 @@ class MockedMangaReaderParser:
 
     def page_urls(self, volume):
         return [
-            f"http://mangareader.net/dragon-ball-episode-of-bardock/{volume}",
-            f"http://mangareader.net/dragon-ball-episode-of-bardock/{volume}/2",
+            (1, f"http://mangareader.net/dragon-ball-episode-of-bardock/{volume}"),
+            (2, f"http://mangareader.net/dragon-ball-episode-of-bardock/{volume}/2"),
         ]
 
     def page_data(self, page_url):
-        volume_num, page_num = page_url.split("/")[-2:]
-        if not volume_num.isdigit():
-            page_num = "1"
+        page_num, _ = page_url
         img = open(f"tests/test_files/jpgs/test-manga_1_{page_num}.jpg", "rb").read()
         return (int(page_num), img)
 
@@ -171,6 +175,14 @@ class MockedMega:
     def find(self, *args, **kwargs):
         return self.found
 
+    def get_files_in_node(self, *args, **kwargs):
+        if not self.found:
+            return {}
+        return {
+            "handle": {"a": {"n": "test-manga_1_1.jpg"}, "s": 1},
+            "other": {"a": {"n": "path"}, "s": 1},
+        }
+
     def create_folder(self, *args, **kwargs):
         return {"dir": "one", "subdir": "two"}
 
@@ -198,6 +210,13 @@ class MockedDropbox:
         searcher.matches = self.match_found
         return searcher
 
+    def files_list_folder(self, path, *args, **kwargs):
+        listing = mock.MagicMock(has_more=False)
+        listing.entries = []
+        if self.match_found:
+            listing.entries = [FileMetadata(name="path", size=1)]
+        return listing
+
     def files_upload(self, *args, **kwargs):
         response = mock.MagicMock()
         response.path_lower = self.file
@@ -212,6 +231,31 @@ class MockedDropboxRealFile(MockedDropbox):
         self.file = "tests/test_files/mangakaka/dragonball_super_page.html"
 
 
+class MockedDropboxSession(MockedDropboxRealFile):
+    """
+    Records the chunks sent through an upload session
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.chunks = []
+
+    def files_upload_session_start(self, f, *args, **kwargs):
+        self.chunks.append(f)
+        return mock.MagicMock(session_id="session")
+
+    def files_upload_session_append_v2(self, f, cursor, *args, **kwargs):
+        assert cursor.offset == sum(len(chunk) for chunk in self.chunks)
+        self.chunks.append(f)
+
+    def files_upload_session_finish(self, f, cursor, commit, *args, **kwargs):
+        assert cursor.offset == sum(len(chunk) for chunk in self.chunks)
+        self.chunks.append(f)
+        response = mock.MagicMock()
+        response.path_lower = commit.path
+        return response
+
+
 def setup_uploader(uploader):
     upl = uploader()
     manga = mock.MagicMock()
@@ -0,0 +1,224 @@
+import os
+from pathlib import Path
+from unittest import mock
+
+import pytest
+import requests
+
+from scraper.cache import HttpCache, ImageCache, JsonCache, canonical_url, image_cache
+from scraper.parsers.mangareader import MangaReader, MangaReaderMangaParser
+from tests.helpers import MockedImgResponse, get_images
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://i1.imggur.net/manga/1.jpg",
+        "http://i1.imggur.net/manga/1.jpg",
+        "//I1.IMGGUR.NET/manga/1.jpg",
+        "https://i1.imggur.net/manga/1.jpg#page",
+    ],
+)
+def test_canonical_url(url):
+    assert canonical_url(url) == "//i1.imggur.net/manga/1.jpg"
+
+
+def test_image_cache_put_and_get(tmp_path):
+    img1, _ = get_images()
+    cache = ImageCache(tmp_path, max_size=10**6)
+    assert cache.get("http://a.com/1.jpg") is None
+    cache.put("http://a.com/1.jpg", img1)
+    assert cache.get("https://a.com/1.jpg") == img1
+    assert cache.size() == len(img1)
+
+
+def test_image_cache_deduplicates_content(tmp_path):
+    img1, _ = get_images()
+    cache = ImageCache(tmp_path, max_size=10**6)
+    cache.put("http://a.com/1.jpg", img1)
+    cache.put("http://b.com/1.jpg", img1)
+    assert len(list(cache.objects.iterdir())) == 1
+    assert cache.get("http://b.com/1.jpg") == img1
+
+
+def test_image_cache_evicts_least_recently_used(tmp_path):
+    cache = ImageCache(tmp_path, max_size=10)
+    cache.put("http://a.com/1.jpg", b"12345")
+    cache.put("http://a.com/2.jpg", b"67890")
+    obj = cache.objects / cache._url_path("http://a.com/1.jpg").read_text()
+    # make page 1 the oldest access
+    os.utime(obj, (0, 0))
+    cache.put("http://a.com/3.jpg", b"abcde")
+    assert cache.get("http://a.com/1.jpg") is None
+    assert cache.get("http://a.com/2.jpg") == b"67890"
+    assert cache.get("http://a.com/3.jpg") == b"abcde"
+    assert cache.size() == 10
+    assert not cache._url_path("http://a.com/1.jpg").exists()
+    assert len(list(cache.urls.iterdir())) == 2
+
+
+def test_image_cache_discards_corrupt_images(tmp_path):
+    cache = ImageCache(tmp_path, max_size=10**6)
+    cache.put("http://a.com/1.jpg", b"12345")
+    obj = cache.objects / cache._url_path("http://a.com/1.jpg").read_text()
+    obj.write_bytes(b"54321")
+    assert cache.get("http://a.com/1.jpg") is None
+    assert not obj.exists()
+    assert cache.size() == 0
+
+
+def test_image_cache_corrupt_image_already_discarded(tmp_path):
+    cache = ImageCache(tmp_path, max_size=10**6)
+    cache.put("http://a.com/1.jpg", b"12345")
+    obj = cache.objects / cache._url_path("http://a.com/1.jpg").read_text()
+    obj.write_bytes(b"54321")
+    # another reader discards the object between this ones read & unlink
+    with mock.patch.object(Path, "unlink", side_effect=FileNotFoundError):
+        assert cache.get("http://a.com/1.jpg") is None
+    assert cache.size() == 5
+
+
+def test_image_cache_disabled(tmp_path):
+    cache = ImageCache(tmp_path, max_size=0)
+    cache.put("http://a.com/1.jpg", b"12345")
+    assert cache.get("http://a.com/1.jpg") is None
+    assert not cache.objects.exists()
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_page_data_served_from_cache(mocked_get):
+    mocked_get.return_value = MockedImgResponse()
+    parser = MangaReaderMangaParser("dragon-ball")
+    page_url = (1, "https://i4.imggur.net/cached/1.jpg")
+    first = parser.page_data(page_url)
+    second = parser.page_data(page_url)
+    assert first == second
+    assert mocked_get.call_count == 1
+    assert image_cache().get(page_url[1]) == first[1]
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_page_data_error_not_cached(mocked_get):
+    response = requests.Response()
+    response.status_code = 503
+    response._content = b"<html>Service Unavailable</html>"
+    mocked_get.return_value = response
+    parser = MangaReaderMangaParser("dragon-ball")
+    page_url = (1, "https://i4.imggur.net/unavailable/1.jpg")
+    with pytest.raises(requests.HTTPError):
+        parser.page_data(page_url)
+    assert image_cache().get(page_url[1]) is None
+
+
+def test_json_cache(tmp_path):
+    cache = JsonCache(tmp_path, ttl=60)
+    assert cache.get("key") is None
+    cache.put("key", [3, 2, 1])
+    assert cache.get("key") == [3, 2, 1]
+
+
+def test_json_cache_expires(tmp_path):
+    cache = JsonCache(tmp_path, ttl=60)
+    cache.put("key", [3, 2, 1])
+    with mock.patch("scraper.cache.time.time", return_value=10**12):
+        assert cache.get("key") is None
+
+
+def test_json_cache_disabled(tmp_path):
+    cache = JsonCache(tmp_path, ttl=0)
+    cache.put("key", [3, 2, 1])
+    assert cache.get("key") is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_json_cache_evicts_oldest_entries(tmp_path):
+    cache = JsonCache(tmp_path, ttl=60, max_entries=2)
+    cache.put("a", 1)
+    os.utime(cache._path("a"), (0, 0))
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+
+
+def test_search_cached_across_parsers(mangareader_search_html):
+    with mock.patch("scraper.parsers.base.get_html_from_url") as mocked_func:
+        mocked_func.return_value = mangareader_search_html
+        first = MangaReader().search("Cached  Dragon Ball")
+        second = MangaReader().search("cached dragon ball")
+    assert first == second
+    assert mocked_func.call_count == 1
+
+
+def http_response(status_code, text="", headers=None):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response._content = text.encode()
+    response.headers.update(headers or {})
+    return response
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_http_cache_serves_fresh_entries(mocked_get, tmp_path):
+    mocked_get.return_value = http_response(200, "chapter")
+    cache = HttpCache(tmp_path, {"chapter": 60})
+    assert cache.fetch("http://a.com/1", "chapter") == "chapter"
+    assert cache.fetch("http://a.com/1", "chapter") == "chapter"
+    assert mocked_get.call_count == 1
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_http_cache_revalidates_stale_entries(mocked_get, tmp_path):
+    headers = {"ETag": '"v1"', "Last-Modified": "Sat, 01 Feb 2020 00:00:00 GMT"}
+    mocked_get.return_value = http_response(200, "series", headers)
+    cache = HttpCache(tmp_path, {"series": 0})
+    assert cache.fetch("http://a.com/manga", "series") == "series"
+    mocked_get.return_value = http_response(304)
+    assert cache.fetch("http://a.com/manga", "series") == "series"
+    mocked_get.assert_called_with(
+        "http://a.com/manga",
+        headers={
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Sat, 01 Feb 2020 00:00:00 GMT",
+        },
+    )
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_http_cache_never_stores_errors(mocked_get, tmp_path):
+    mocked_get.return_value = http_response(404)
+    cache = HttpCache(tmp_path, {"chapter": 60})
+    with pytest.raises(requests.exceptions.HTTPError):
+        cache.fetch("http://a.com/1", "chapter")
+    assert not list(tmp_path.iterdir())
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_http_cache_invalidate(mocked_get, tmp_path):
+    mocked_get.return_value = http_response(200, "not released yet")
+    cache = HttpCache(tmp_path, {"chapter": 60})
+    cache.fetch("http://a.com/1", "chapter")
+    cache.invalidate("http://a.com/1")
+    cache.fetch("http://a.com/1", "chapter")
+    assert mocked_get.call_count == 2
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_http_cache_evicts_oldest_entries(mocked_get, tmp_path):
+    mocked_get.return_value = http_response(200, "chapter")
+    cache = HttpCache(tmp_path, {"chapter": 60}, max_entries=2)
+    for chapter in range(3):
+        cache.fetch(f"http://a.com/{chapter}", "chapter")
+        os.utime(cache._path(f"http://a.com/{chapter}"), (chapter, chapter))
+    assert len(list(tmp_path.iterdir())) == 2
+    assert not cache._path("http://a.com/0").exists()
+
+
+@mock.patch("scraper.utils.requests.Session.get")
+def test_http_cache_skips_large_pages(mocked_get, tmp_path):
+    headers = {"ETag": '"v1"'}
+    mocked_get.return_value = http_response(200, "x" * 11, headers)
+    cache = HttpCache(tmp_path, {"series": 0}, max_page_size=10)
+    assert cache.fetch("http://a.com/manga", "series") == "x" * 11
+    assert not list(tmp_path.iterdir())
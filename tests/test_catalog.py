@@ -0,0 +1,83 @@
+from unittest import mock
+
+from scraper.__main__ import cli
+from scraper.catalog import Catalog, catalog, similarity
+from scraper.exceptions import MangaDoesNotExist
+from scraper.parsers.mangareader import MangaReader
+from tests.helpers import METADATA
+
+
+def test_similarity():
+    assert similarity("Dragon Ball", "dragon-ball") == 1
+    assert similarity("dragon ball", "one piece") < 0.1
+
+
+def test_closest_match(tmp_path):
+    index = Catalog(tmp_path / "catalog.json")
+    index.add_results(METADATA)
+    assert index.closest("Dragon Ball") == "dragon-ball"
+    assert index.closest("naruto") is None
+    # close, but not close enough to download without asking
+    assert index.closest("dragonbal super") is None
+    assert index.candidates("dragonbal super")[0] == (
+        "dragon-ball-super",
+        "Dragon Ball Super",
+    )
+    assert index.candidates("naruto") == []
+
+
+def test_closest_match_needs_a_clear_lead(tmp_path):
+    index = Catalog(tmp_path / "catalog.json")
+    index.add("dragon-ball", title="Dragon Ball")
+    index.add("dragon-ball-super", title="Dragon Ball Super")
+    assert index.closest("dragon ball gt") is None
+    assert index.closest("dragon ball z") is None
+    assert [slug for slug, _ in index.candidates("dragon ball z")] == [
+        "dragon-ball",
+        "dragon-ball-super",
+    ]
+
+
+def test_catalog_persisted_and_merged(tmp_path):
+    path = tmp_path / "catalog.json"
+    first, second = Catalog(path), Catalog(path)
+    first.add("dragon-ball", chapters=520)
+    second.add("one-piece", title="One Piece")
+    reloaded = Catalog(path)
+    assert reloaded.entries["dragon-ball"] == {
+        "title": "dragon ball",
+        "chapters": "520",
+    }
+    assert reloaded.entries["one-piece"] == {"title": "One Piece"}
+
+
+def test_search_results_harvested(mangareader_search_html):
+    with mock.patch("scraper.parsers.base.get_html_from_url") as mocked_func:
+        mocked_func.return_value = mangareader_search_html
+        MangaReader().search("harvested dragon ball")
+    assert "dragon-ball-super" in catalog("http://mangareader.net").entries
+
+
+def fake_downloader(*args, **kwargs):
+    if kwargs["manga_name"] != "one-punch-man":
+        raise MangaDoesNotExist(kwargs["manga_name"])
+    return True
+
+
+def test_cli_resolves_typo_from_catalog():
+    catalog("http://mangareader.net").add("one-punch-man", title="Onepunch-Man")
+    with mock.patch("scraper.__main__.download_manga", fake_downloader):
+        with mock.patch("scraper.__main__.manga_search") as mocked_search:
+            args = cli(["--manga", "onepunch man"])
+    assert args["manga"] == "one-punch-man"
+    mocked_search.assert_not_called()
+
+
+def test_cli_offers_close_catalog_matches(monkeypatch):
+    catalog("http://mangareader.net").add("one-punch-man", title="Onepunch-Man")
+    monkeypatch.setattr("builtins.input", lambda _: "1")
+    with mock.patch("scraper.__main__.download_manga", fake_downloader):
+        with mock.patch("scraper.__main__.manga_search") as mocked_search:
+            args = cli(["--manga", "one punch mann"])
+    assert args["manga"] == "one-punch-man"
+    mocked_search.assert_not_called()
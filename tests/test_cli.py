@@ -1,9 +1,14 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
 from unittest import mock
 
 import pytest
 
-from scraper.__main__ import cli, get_manga_parser
+from scraper.__main__ import cli, get_manga_parser, get_uploader
 from scraper.exceptions import MangaDoesNotExist
+from scraper.manga import Manga
 from tests.helpers import MockedSiteParser
 
 PATAMETERS = [
@@ -19,6 +24,8 @@ PATAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -33,6 +40,8 @@ PATAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -47,6 +56,8 @@ PATAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -61,6 +72,8 @@ PATAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -83,6 +96,8 @@ PATAMETERS = [
             "upload": None,
             "override_name": "dragon_kin",
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -97,6 +112,8 @@ PATAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
 ]
@@ -115,6 +132,8 @@ SEARCH_PARAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -129,7 +148,9 @@ SEARCH_PARAMETERS = [
             "filetype": "pdf",
             "override_name": None,
             "remove": False,
+            "diskless": False,
             "upload": None,
+            "engine": "pool",
         },
     ),
     (
@@ -145,6 +166,8 @@ SEARCH_PARAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -160,6 +183,8 @@ SEARCH_PARAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
     (
@@ -175,6 +200,8 @@ SEARCH_PARAMETERS = [
             "upload": None,
             "override_name": None,
             "remove": False,
+            "diskless": False,
+            "engine": "pool",
         },
     ),
 ]
@@ -188,6 +215,22 @@ def test_ioerror_remove_upload_args():
         cli(["--search", "x", "--remove"])
 
 
+def test_ioerror_diskless_without_upload():
+    with pytest.raises(IOError):
+        cli(["--manga", "dragonball", "--diskless"])
+
+
+@pytest.mark.parametrize("service", ["mega", "pcloud"])
+def test_ioerror_diskless_without_streaming_upload(service):
+    with pytest.raises(IOError):
+        cli(["--manga", "dragonball", "--diskless", "--upload", service])
+
+
+def test_ioerror_source_all_without_search():
+    with pytest.raises(IOError):
+        cli(["--manga", "dragonball", "--source", "all"])
+
+
 @pytest.mark.parametrize("arguments,expected", PATAMETERS)
 @mock.patch("scraper.__main__.download_manga", mock.Mock(return_value=1))
 def test_download_via_cli(arguments, expected):
@@ -229,7 +272,7 @@ def test_search_if_failed_manga_match(monkeypatch, mangareader_search_html):
     with mock.patch("scraper.__main__.download_manga", fake_downloader):
         with mock.patch("scraper.__main__.manga_search") as mocked_func:
             # mock manga_search to return values that signifies it was triggered
-            mocked_func.return_value = ("search activated", "2")
+            mocked_func.return_value = ("search activated", "2", "mangareader")
             args = cli(["--manga", "dragonballzz"])
             expected = {
                 "manga": "search activated",
@@ -241,5 +284,46 @@ def test_search_if_failed_manga_match(monkeypatch, mangareader_search_html):
                 "upload": None,
                 "override_name": "None",
                 "remove": False,
+                "diskless": False,
+                "engine": "pool",
             }
             assert args == expected
+
+
+def test_cli_startup_skips_heavy_imports(tmp_path):
+    """
+    --help & --version shouldn't pay for PIL, bs4 or the uploader SDKs
+    """
+    code = (
+        "import sys, scraper.__main__ as m; m.get_parser(); "
+        "print(' '.join(sorted(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        # keep the developers own config out of the test
+        env={**os.environ, "HOME": str(tmp_path)},
+    )
+    modules = {name.split(".")[0] for name in output.stdout.split()}
+    heavy = {"PIL", "reportlab", "bs4", "lxml", "tabulate", "dropbox", "mega", "pcloud"}
+    assert not modules & heavy
+
+
+def test_uploader_created_once_when_needed():
+    def fake_downloader(manga_name, **kwargs):
+        if manga_name != "search activated":
+            raise MangaDoesNotExist(manga_name)
+        # the pre-flight check for volumes already in the cloud
+        kwargs["uploaded"](Path("/search activated/volume_1.pdf"))
+        return Manga(manga_name, "pdf")
+
+    get_uploader.cache_clear()
+    with mock.patch("scraper.__main__.uploader_class") as mocked_class:
+        with mock.patch("scraper.__main__.download_manga", fake_downloader):
+            with mock.patch("scraper.__main__.manga_search") as mocked_search:
+                mocked_search.return_value = ("search activated", "", "mangareader")
+                cli(["--manga", "dragonballzz", "--upload", "dropbox"])
+    get_uploader.cache_clear()
+    mocked_class.return_value.assert_called_once_with()
@@ -1,12 +1,17 @@
 import os
+import pickle
 import shutil
+import zipfile
+from io import BytesIO
 from pathlib import Path
+from unittest import mock
 
 import pytest
 
 from scraper.__main__ import download_manga
-from scraper.download import Download
-from tests.helpers import MockedSiteParser
+from scraper.download import Download, write_cbz
+from scraper.journal import MemoryBudget
+from tests.helpers import MockedSiteParser, get_images
 
 
 @pytest.mark.parametrize("filetype,file_signature", [("pdf", "%PDF-"), ("cbz", "PK")])
@@ -43,6 +48,42 @@ def test_download_manga_helper_function_preffered_name(parser):
     assert os.path.exists(expected_path2)
 
 
+def test_saved_volumes_release_memory_budget():
+    downloader = Download("budget-manga", "cbz", MockedSiteParser)
+    manga = downloader.download_volumes([1, 2])
+    assert downloader.factory.budget.used == 0
+    assert all(page.img is None for page in manga.volume[1].pages)
+    shutil.rmtree("/tmp/budget-manga")
+
+
+def test_spooled_volume_is_cheap_to_pickle():
+    downloader = Download("pickled-manga", "pdf", MockedSiteParser)
+    downloader.factory.budget = MemoryBudget(0)
+    manga = downloader.factory.get_manga_volumes([1])
+    volume = manga.volume[1]
+    spooled = downloader._spool(volume)
+    assert spooled.pages == volume.pages
+    assert all(page.img is None for page in spooled.pages)
+    assert len(pickle.dumps(spooled)) < 1000
+
+
+def test_spooled_volume_keeps_pages_in_memory():
+    downloader = Download("pickled-manga", "pdf", MockedSiteParser)
+    manga = downloader.factory.get_manga_volumes([1])
+    volume = manga.volume[1]
+    spooled = downloader._spool(volume)
+    assert [page.img for page in spooled.pages] == get_images()
+
+
+def test_write_cbz_streams_pages(volume):
+    sink = BytesIO()
+    write_cbz(volume, sink)
+    with zipfile.ZipFile(sink) as cbz:
+        assert cbz.namelist() == ["001_1.jpg", "002_1.jpg"]
+        assert [cbz.read(name) for name in cbz.namelist()] == get_images()
+        assert all(i.compress_type == zipfile.ZIP_STORED for i in cbz.infolist())
+
+
 def teardown_module(module):
     """
     Remove directories after every test, if present
@@ -53,3 +94,66 @@ def teardown_module(module):
     tmp_dir = Path("/tmp/dragon-ball")
     if tmp_dir.exists():
         shutil.rmtree(tmp_dir)
+
+
+def test_download_hands_each_saved_volume_on():
+    saved = []
+    downloader = Download(
+        "streamed-manga",
+        "cbz",
+        MockedSiteParser,
+        on_saved=lambda manga, volume, file: saved.append(volume.file_path.exists()),
+    )
+    downloader.download_volumes([1, 2])
+    assert saved == [True, True]
+    shutil.rmtree("/tmp/streamed-manga")
+
+
+@pytest.mark.parametrize("filetype,file_signature", [("pdf", b"%PDF-"), ("cbz", b"PK")])
+def test_diskless_download_streams_converted_volumes(filetype, file_signature):
+    saved = {}
+
+    def on_saved(manga, volume, file):
+        assert not file.seekable()
+        saved[volume.number] = file.read()
+
+    downloader = Download(
+        "diskless-manga", filetype, MockedSiteParser, on_saved=on_saved, diskless=True
+    )
+    manga = downloader.download_volumes([1, 2])
+    assert not os.path.exists("/tmp/diskless-manga")
+    assert sorted(saved) == [1, 2]
+    assert all(data.startswith(file_signature) for data in saved.values())
+    if filetype == "cbz":
+        for volume in manga.volumes:
+            with zipfile.ZipFile(BytesIO(saved[volume.number])) as cbz:
+                assert len(cbz.namelist()) == len(volume.pages)
+
+
+def failed_conversion(volume, adapter, sink):
+    sink.write(b"PK")
+    raise ValueError("conversion failed")
+
+
+def test_diskless_download_fails_stream_with_conversion():
+    errors = []
+
+    def on_saved(manga, volume, file):
+        try:
+            file.read()
+        except IOError as e:
+            errors.append(e)
+
+    downloader = Download(
+        "diskless-manga", "cbz", MockedSiteParser, on_saved=on_saved, diskless=True
+    )
+    with mock.patch.dict("scraper.download.CONVERTERS", {"cbz": failed_conversion}):
+        with pytest.raises(ValueError):
+            downloader.download_volumes([1])
+    assert len(errors) == 1
+    assert downloader.factory.journal(1).has_page(1)
+
+
+def test_diskless_download_needs_on_saved():
+    with pytest.raises(ValueError):
+        Download("diskless-manga", "cbz", MockedSiteParser, diskless=True)
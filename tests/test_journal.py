@@ -0,0 +1,51 @@
+from scraper.journal import MemoryBudget, VolumeJournal
+
+
+def test_journal_page_urls():
+    journal = VolumeJournal("http://mangareader.net", "journal-test", 1)
+    assert journal.page_urls() is None
+    journal.save_page_urls([(1, "http://a.com/1.jpg"), (2, "http://a.com/2.jpg")])
+    assert journal.page_urls() == [(1, "http://a.com/1.jpg"), (2, "http://a.com/2.jpg")]
+
+
+def test_journal_pages():
+    journal = VolumeJournal("http://mangareader.net", "journal-test", 1)
+    journal.save_page(3, b"img")
+    assert journal.has_page(3)
+    assert not journal.has_page(4)
+    assert journal.page_path(3).read_bytes() == b"img"
+    journal.clear()
+    assert not journal.directory.exists()
+
+
+def test_journal_links_cached_page(tmp_path):
+    cached = tmp_path / "object"
+    cached.write_bytes(b"img")
+    journal = VolumeJournal("http://mangareader.net", "journal-test", 1)
+    journal.save_page(3, b"img", cached)
+    assert journal.page_path(3).read_bytes() == b"img"
+    assert journal.page_path(3).stat().st_ino == cached.stat().st_ino
+    journal.clear()
+    assert cached.read_bytes() == b"img"
+
+
+def test_journal_separates_sources():
+    mangareader = VolumeJournal("http://mangareader.net", "journal-test", 1)
+    mangafast = VolumeJournal("http://mangafast.net", "journal-test", 1)
+    assert mangareader.directory != mangafast.directory
+
+
+def test_memory_budget():
+    budget = MemoryBudget(10)
+    assert budget.reserve(6)
+    assert not budget.reserve(5)
+    assert budget.reserve(4)
+    assert budget.used == 10
+
+
+def test_memory_budget_release():
+    budget = MemoryBudget(10)
+    assert budget.reserve(10)
+    budget.release(6)
+    assert budget.reserve(6)
+    assert budget.used == 10
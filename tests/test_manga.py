@@ -1,10 +1,13 @@
+import pickle
 from pathlib import Path
+from unittest import mock
 
 import pytest
+import requests
 
 from scraper.exceptions import PageAlreadyPresent, VolumeAlreadyPresent
 from scraper.manga import Manga, MangaBuilder, Page, Volume
-from tests.helpers import MockedSiteParser
+from tests.helpers import MockedSiteParser, get_images
 
 
 def test_page_repr(page):
@@ -17,6 +20,34 @@ def test_page_str(page):
     assert page.__str__() == expected
 
 
+def test_page_read_from_spool(tmp_path):
+    spool = tmp_path / "1"
+    spool.write_bytes(b"bytes")
+    page = Page(number=1, path=spool)
+    assert page.read() == b"bytes"
+    assert page.open().read() == b"bytes"
+    assert page == Page(number=1, path=spool)
+    # equality doesn't read the spool file
+    assert page != Page(number=1, img=b"bytes")
+    assert str(page) == "Page(number=1, img=True)"
+
+
+def test_page_is_compact_and_immutable(page):
+    assert not hasattr(page, "__dict__")
+    with pytest.raises(AttributeError):
+        page.number = 2
+    assert pickle.loads(pickle.dumps(page)) == page
+
+
+def test_volume_pages_kept_in_order():
+    volume = Volume(1, "/Some/path", "/some/path")
+    for number in [2, 5, 1, 3]:
+        volume.add_page(number, b"bytes")
+    assert [page.number for page in volume.pages] == [1, 2, 3, 5]
+    assert [page.number for page in volume] == [1, 2, 3, 5]
+    assert volume.total_pages() == 5
+
+
 def test_volume_add_page():
     volume = Volume(1, "/Some/path", "/some/path")
     volume.add_page(1, b"bytes")
@@ -53,6 +84,10 @@ def test_volume_total_pages(volume):
     assert volume.total_pages() == 2
 
 
+def test_empty_volume_total_pages():
+    assert Volume(1, "/Some/path", "/some/path").total_pages() == 0
+
+
 def test_cant_add_page_already_in_volume(volume):
     with pytest.raises(PageAlreadyPresent):
         volume.add_page(1, b"something")
@@ -239,3 +274,139 @@ def test_manga_builder_preferred_name(parser):
     pages = [(1, img1.read()), (2, img2.read())]
     v1.pages = pages
     assert manga.volume[1] == v1
+
+
+@pytest.mark.parametrize("inval", [[1, 2, 3], None])
+def test_mangabuilder_async_engine(inval):
+    pool_builder = MangaBuilder(MockedSiteParser())
+    async_builder = MangaBuilder(MockedSiteParser(), engine="async")
+    expected = pool_builder.get_manga_volumes(vol_nums=inval)
+    manga = async_builder.get_manga_volumes(vol_nums=inval)
+    assert manga.volumes == expected.volumes
+    assert manga.volume[3].page[2].read() == expected.volume[3].page[2].read()
+
+
+def test_mangabuilder_invalid_engine():
+    with pytest.raises(ValueError):
+        MangaBuilder(MockedSiteParser(), engine="gevent")
+
+
+@pytest.mark.parametrize("depth", [0, -1])
+def test_mangabuilder_invalid_pipeline_depth(depth):
+    config = {"config": {"pipeline_depth": depth}}
+    with mock.patch("scraper.manga.settings", return_value=config):
+        with pytest.raises(ValueError):
+            MangaBuilder(MockedSiteParser())
+
+
+def test_mangabuilder_resumes_incomplete_volume(caplog):
+    parser = MockedSiteParser("flaky-manga")
+    builder = MangaBuilder(parser)
+    page_data = parser.manga.page_data
+
+    def fail_page_two(page_url):
+        if page_url[0] == 2:
+            raise requests.exceptions.ConnectionError("connection reset")
+        return page_data(page_url)
+
+    with mock.patch.object(parser.manga, "page_data", side_effect=fail_page_two):
+        manga = builder.get_manga_volumes(vol_nums=[1])
+    assert manga.volumes == []
+    assert "missing 1 page(s)" in caplog.text
+    assert builder.budget.used == 0
+    journal = builder.journal(1)
+    assert journal.has_page(1)
+    assert not journal.has_page(2)
+
+    with mock.patch.object(parser.manga, "page_data", side_effect=page_data) as m:
+        with mock.patch.object(parser.manga, "page_urls") as mocked_urls:
+            manga = builder.get_manga_volumes(vol_nums=[1])
+    m.assert_called_once_with(
+        (2, "http://mangareader.net/dragon-ball-episode-of-bardock/1/2")
+    )
+    mocked_urls.assert_not_called()
+    assert len(manga.volume[1].pages) == 2
+
+
+@pytest.mark.parametrize("engine", ["pool", "async"])
+def test_mangabuilder_skips_saved_volumes_before_fetching(engine, tmp_path, caplog):
+    config = {"config": {"manga_directory": str(tmp_path), "upload_root": "/"}}
+    saved = tmp_path / "saved-manga" / "saved-manga_volume_1.pdf"
+    saved.parent.mkdir()
+    saved.write_bytes(b"%PDF-")
+    parser = MockedSiteParser("saved-manga")
+    builder = MangaBuilder(parser, engine=engine)
+    page_urls = parser.manga.page_urls
+    with mock.patch("scraper.manga.settings", return_value=config):
+        with mock.patch.object(
+            parser.manga, "page_urls", side_effect=page_urls
+        ) as mocked_urls:
+            manga = builder.get_manga_volumes(vol_nums=[1, 2])
+    mocked_urls.assert_called_once_with(2)
+    assert [volume.number for volume in manga.volumes] == [1, 2]
+    assert manga.volume[1].pages == []
+    assert "Volume 1 already saved to disk" in caplog.text
+
+
+@pytest.mark.parametrize("engine", ["pool", "async"])
+def test_mangabuilder_skips_uploaded_volumes_before_fetching(engine, caplog):
+    parser = MockedSiteParser("uploaded-manga")
+    builder = MangaBuilder(parser, engine=engine)
+    page_urls = parser.manga.page_urls
+    uploaded = mock.Mock(side_effect=lambda path: path.name.endswith("_1.pdf"))
+    manga = builder.manga()
+    with mock.patch.object(
+        parser.manga, "page_urls", side_effect=page_urls
+    ) as mocked_urls:
+        volumes = list(builder.iter_volumes(manga, [1, 2], uploaded))
+    mocked_urls.assert_called_once_with(2)
+    assert [volume.number for volume in volumes] == [2]
+    assert [volume.number for volume in manga.volumes] == [2]
+    uploaded.assert_any_call(
+        manga.volume[2].upload_path.with_name("uploaded-manga_volume_1.pdf")
+    )
+    assert "Volume 1 already uploaded" in caplog.text
+
+
+def test_mangabuilder_spools_pages_beyond_memory_budget():
+    config = {
+        "config": {"manga_directory": "/tmp", "upload_root": "/", "memory_budget": 0}
+    }
+    with mock.patch("scraper.manga.settings", return_value=config):
+        builder = MangaBuilder(MockedSiteParser("spooled-manga"))
+        manga = builder.get_manga_volumes(vol_nums=[1])
+    page = manga.volume[1].page[1]
+    assert page.img is None
+    assert page.path == builder.journal(1).page_path(1)
+    assert page.read() == get_images()[0]
+
+
+@pytest.mark.parametrize("engine", ["pool", "async"])
+def test_mangabuilder_iter_volumes_yields_each_volume_once_downloaded(engine):
+    config = {
+        "config": {"manga_directory": "/tmp", "upload_root": "/", "pipeline_depth": 1}
+    }
+    parser = MockedSiteParser("pipelined-manga")
+    page_data = parser.manga.page_data
+    page_urls = parser.manga.page_urls
+    requested = []
+
+    def record(page_url):
+        requested.append(page_url)
+        return page_data(page_url)
+
+    with mock.patch("scraper.manga.settings", return_value=config):
+        builder = MangaBuilder(parser, engine=engine)
+    with mock.patch.object(parser.manga, "page_data", side_effect=record):
+        with mock.patch.object(
+            parser.manga, "page_urls", side_effect=page_urls
+        ) as mocked_urls:
+            manga = builder.manga()
+            yielded = []
+            for volume in builder.iter_volumes(manga, [1, 2, 3]):
+                yielded.append(volume.number)
+                # the next volume only starts once this one is taken
+                assert len(requested) == 2 * len(yielded)
+                assert mocked_urls.call_count == len(yielded)
+    assert sorted(yielded) == [1, 2, 3]
+    assert [vol.number for vol in manga.volumes] == [1, 2, 3]
@@ -2,6 +2,7 @@ from unittest import mock
 
 import pytest
 
+from scraper.cache import JsonCache
 from scraper.exceptions import VolumeDoesntExist
 from scraper.parsers.mangafast import MangaFast, MangaFastMangaParser, MangaFastSearch
 from tests.helpers import MockedImgResponse
@@ -78,6 +79,27 @@ def test_all_volume_numbers(mangafast_manga_title_page_html):
         assert all_vols == expected
 
 
+def test_all_volume_numbers_scraped_once(mangafast_manga_title_page_html):
+    with mock.patch("scraper.parsers.mangafast.get_html_from_url") as mocked_func:
+        mocked_func.return_value = mangafast_manga_title_page_html
+        parser = MangaFastMangaParser("dragon-ball-super")
+        assert parser.all_volume_numbers() == parser.all_volume_numbers()
+        mocked_func.assert_called_once()
+
+
+def test_all_volume_numbers_cached_across_parsers(
+    tmp_path, mangafast_manga_title_page_html
+):
+    cache = JsonCache(tmp_path, ttl=60)
+    with mock.patch("scraper.parsers.mangafast.chapter_list_cache", return_value=cache):
+        with mock.patch("scraper.parsers.mangafast.get_html_from_url") as mocked_func:
+            mocked_func.return_value = mangafast_manga_title_page_html
+            first = MangaFastMangaParser("dragon-ball-super").all_volume_numbers()
+            second = MangaFastMangaParser("dragon-ball-super").all_volume_numbers()
+            assert first == second
+            mocked_func.assert_called_once()
+
+
 def test_page_urls(mangafast_volume_html):
     func = "scraper.parsers.mangafast.get_html_from_url"
     method = "scraper.parsers.mangafast.MangaFastMangaParser.all_volume_numbers"
@@ -174,7 +196,7 @@ def test_invalid_volume_parser(mangafast_volume_html):
                 parser.page_urls(2000)
 
 
-@mock.patch("scraper.parsers.mangareader.requests.get")
+@mock.patch("scraper.utils.requests.Session.get")
 def test_page_data(mocked_get, mangareader_page_html):
     mocked_get.return_value = MockedImgResponse()
     with mock.patch("scraper.parsers.mangafast.get_html_from_url") as mocked_func:
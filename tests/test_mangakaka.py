@@ -228,7 +228,7 @@ def test_invalid_volume_parser(mangakaka_invalid_volume_html):
             parser.page_urls(2000)
 
 
-@mock.patch("scraper.parsers.mangakaka.requests.get")
+@mock.patch("scraper.utils.requests.Session.get")
 def test_page_data(mocked_get, mangakaka_volume_html):
     mocked_get.return_value = MockedImgResponse()
     with mock.patch("scraper.parsers.mangakaka.get_html_from_url") as mocked_func:
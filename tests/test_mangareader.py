@@ -19,11 +19,16 @@ def test_all_volume_numbers(mangareader_manga_title_page_html):
         assert all_vols == [1, 2, 3]
 
 
-def test_page_urls(mangareader_volume_html):
-    with mock.patch("scraper.parsers.mangareader.get_html_from_url") as mocked_func:
-        mocked_func.return_value = mangareader_volume_html
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_page_urls(fast_path, mangareader_volume_text):
+    with mock.patch("scraper.parsers.mangareader.get_text_from_url") as mocked_func:
+        mocked_func.return_value = mangareader_volume_text
         parser = MangaReaderMangaParser("dragon-ball")
-        page_urls = parser.page_urls(1)
+        if fast_path:
+            page_urls = parser.page_urls(1)
+        else:
+            with mock.patch.object(parser, "_fast_page_metadata", return_value=None):
+                page_urls = parser.page_urls(1)
         expected = [
             (
                 1,
@@ -109,15 +114,30 @@ def test_page_urls(mangareader_volume_html):
         assert page_urls == expected
 
 
-def test_invalid_volume_parser(mangareader_invalid_volume_html):
-    with mock.patch("scraper.parsers.mangareader.get_html_from_url") as mocked_func:
-        mocked_func.return_value = mangareader_invalid_volume_html
+def test_invalid_volume_parser(mangareader_invalid_volume_text):
+    with mock.patch("scraper.parsers.mangareader.get_text_from_url") as mocked_func:
+        mocked_func.return_value = mangareader_invalid_volume_text
         parser = MangaReaderMangaParser("dragon-ball")
         with pytest.raises(VolumeDoesntExist):
             parser.page_urls(2000)
 
 
-@mock.patch("scraper.parsers.mangareader.requests.get")
+def test_invalid_volume_parser_without_fast_path(mangareader_invalid_volume_text):
+    parser = MangaReaderMangaParser("dragon-ball")
+    with mock.patch.object(parser, "_get_volume_text") as mocked_func:
+        mocked_func.return_value = mangareader_invalid_volume_text
+        with pytest.raises(VolumeDoesntExist):
+            parser._scrape_volume(2000)
+
+
+def test_fast_page_metadata_falls_back_on_unexpected_html():
+    parser = MangaReaderMangaParser("dragon-ball")
+    html = '<script>document["mj"]={"mn": broken}</script><p>pages</p>'
+    assert parser._fast_page_metadata(1, html) is None
+    assert parser._fast_page_metadata(1, "<html></html>") is None
+
+
+@mock.patch("scraper.utils.requests.Session.get")
 def test_page_data(mocked_get, mangareader_page_html):
     mocked_get.return_value = MockedImgResponse()
     with mock.patch("scraper.parsers.mangareader.get_html_from_url") as mocked_func:
@@ -0,0 +1,69 @@
+import threading
+from unittest import mock
+
+import pytest
+import requests
+
+from scraper.parsers import site_parsers
+from scraper.parsers.mangafast import MangaFast
+from scraper.parsers.mangareader import MangaReader
+from scraper.parsers.multi import AllSources
+from tests.helpers import METADATA
+
+MANGAFAST_RESULT = {
+    "chapters": "62",
+    "manga_url": "dragon-ball-super",
+    "source": "mangafast",
+    "title": "Dragon Ball Super",
+}
+
+
+def test_search_merges_results():
+    with mock.patch.object(MangaReader, "search", return_value=METADATA):
+        with mock.patch.object(
+            MangaFast, "search", return_value={"1": MANGAFAST_RESULT}
+        ):
+            results = AllSources().search("dragon ball")
+    assert len(results) == len(METADATA) + 1
+    assert list(results) == [str(i) for i in range(1, len(results) + 1)]
+    assert results[str(len(results))] == MANGAFAST_RESULT
+
+
+def test_search_skips_failed_sources():
+    error = requests.exceptions.ConnectionError("down")
+    with mock.patch.object(MangaReader, "search", side_effect=error):
+        with mock.patch.object(
+            MangaFast, "search", return_value={"1": MANGAFAST_RESULT}
+        ):
+            results = AllSources().search("dragon ball")
+    assert results == {"1": MANGAFAST_RESULT}
+
+
+def test_search_skips_slow_sources():
+    release = threading.Event()
+
+    def slow_search(*args):
+        release.wait()
+        return METADATA
+
+    with mock.patch("scraper.parsers.multi.settings") as mocked_settings:
+        mocked_settings.return_value = {"config": {"search_timeout": 0.1}}
+        with mock.patch.object(MangaReader, "search", slow_search):
+            with mock.patch.object(
+                MangaFast, "search", return_value={"1": MANGAFAST_RESULT}
+            ):
+                results = AllSources().search("dragon ball")
+                release.set()
+    assert results == {"1": MANGAFAST_RESULT}
+
+
+def test_search_without_results_exits():
+    with mock.patch.object(MangaReader, "search", side_effect=SystemExit):
+        with mock.patch.object(MangaFast, "search", return_value={}):
+            with pytest.raises(SystemExit):
+                AllSources().search("gibberish")
+
+
+def test_searches_every_supported_site():
+    sites = AllSources().sites
+    assert [type(site) for site in sites] == list(site_parsers().values())
@@ -34,7 +34,7 @@ def test_set_manga_parser(siteparser, mangaparser):
 
 
 @pytest.mark.parametrize("mangaparser", ALL_PARSERS)
-@mock.patch("scraper.utils.requests.get")
+@mock.patch("scraper.utils.requests.Session.get")
 def test_404_errors(mock_request, mangaparser):
     mock_resp = requests.models.Response()
     mock_resp.status_code = 404
@@ -47,7 +47,7 @@ def test_404_errors(mock_request, mangaparser):
 
 
 @pytest.mark.parametrize("mangaparser", ALL_PARSERS)
-@mock.patch("scraper.utils.requests.get")
+@mock.patch("scraper.utils.requests.Session.get")
 def test_non_404_errors(mock_request, mangaparser):
     mock_resp = requests.models.Response()
     mock_resp.status_code = 403
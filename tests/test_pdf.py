@@ -0,0 +1,62 @@
+import re
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from scraper.exceptions import UnsupportedImage
+from scraper.pdf import image_size, jpeg_info, write_jpeg_pdf
+from tests.helpers import get_images
+
+
+def encode(mode, fmt, **kwargs):
+    output = BytesIO()
+    Image.new(mode, (40, 30)).save(output, format=fmt, **kwargs)
+    return output.getvalue()
+
+
+def test_jpeg_info_matches_pil():
+    for img in get_images():
+        width, height, bits, components = jpeg_info(img)
+        assert (width, height) == Image.open(BytesIO(img)).size
+        assert bits == 8
+
+
+@pytest.mark.parametrize(
+    "mode,fmt,kwargs",
+    [("RGB", "JPEG", {}), ("RGB", "JPEG", {"progressive": True}), ("RGB", "PNG", {})],
+)
+def test_image_size(mode, fmt, kwargs):
+    assert image_size(encode(mode, fmt, **kwargs)) == (40, 30)
+
+
+def test_image_size_unknown_format():
+    assert image_size(b"GIF89a") is None
+
+
+def test_jpegs_embedded_verbatim():
+    images = get_images()
+    pdf = BytesIO()
+    write_jpeg_pdf(images, pdf)
+    data = pdf.getvalue()
+    assert data.startswith(b"%PDF-1.4")
+    assert data.endswith(b"%%EOF\n")
+    for img in images:
+        assert img in data
+    assert data.count(b"/Type /Page ") == len(images)
+
+
+def test_cross_reference_offsets():
+    pdf = BytesIO()
+    write_jpeg_pdf(get_images(), pdf)
+    data = pdf.getvalue()
+    startxref = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    offsets = re.findall(rb"(\d{10}) 00000 n", data[startxref:])
+    for number, offset in enumerate(offsets, start=1):
+        assert data[int(offset) :].startswith(b"%d 0 obj" % number)
+
+
+@pytest.mark.parametrize("img", [encode("RGB", "PNG"), encode("CMYK", "JPEG")])
+def test_unsupported_images(img):
+    with pytest.raises(UnsupportedImage):
+        write_jpeg_pdf([img], BytesIO())
@@ -0,0 +1,50 @@
+import io
+import threading
+from multiprocessing import Pipe
+
+import pytest
+
+from scraper.pipe import CHUNK_SIZE, PipeReader, PipeWriter
+
+
+def write(connection, data, finish=True):
+    writer = PipeWriter(connection)
+    with io.BufferedWriter(writer, CHUNK_SIZE) as sink:
+        for i in range(0, len(data), 1000):
+            sink.write(data[i : i + 1000])
+        sink.flush()
+        if finish:
+            writer.finish()
+
+
+def test_pipe_streams_data():
+    data = bytes(range(256)) * 10_000
+    received, sent = Pipe(duplex=False)
+    thread = threading.Thread(target=write, args=(sent, data))
+    thread.start()
+    with io.BufferedReader(PipeReader(received), CHUNK_SIZE) as stream:
+        assert stream.read(10) == data[:10]
+        assert stream.read() == data[10:]
+    thread.join()
+
+
+def test_pipe_unfinished_stream_raises():
+    received, sent = Pipe(duplex=False)
+    thread = threading.Thread(target=write, args=(sent, b"PK", False))
+    thread.start()
+    with io.BufferedReader(PipeReader(received)) as stream:
+        with pytest.raises(IOError):
+            stream.read()
+    thread.join()
+
+
+def test_pipe_drain_unblocks_writer():
+    data = b"x" * (4 * CHUNK_SIZE)
+    received, sent = Pipe(duplex=False)
+    thread = threading.Thread(target=write, args=(sent, data))
+    thread.start()
+    reader = PipeReader(received)
+    reader.drain()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    reader.close()
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from scraper.scheduler import Scheduler, interleave
+
+
+def test_interleave():
+    jobs = {1: ["a", "b", "c"], 2: ["d"], 3: ["e", "f"]}
+    expected = [(1, "a"), (2, "d"), (3, "e"), (1, "b"), (3, "f"), (1, "c")]
+    assert list(interleave(jobs)) == expected
+
+
+def test_scheduler_returns_results():
+    with Scheduler(max_connections=4, max_per_host=2) as scheduler:
+        futures = [scheduler.submit("http://a.com/1", pow, n, 2) for n in range(5)]
+        assert [f.result() for f in futures] == [0, 1, 4, 9, 16]
+
+
+def test_scheduler_limits_requests_per_host():
+    lock = threading.Lock()
+    active = {"a.com": 0, "b.com": 0}
+    peak = {"a.com": 0, "b.com": 0}
+
+    def fetch(host):
+        with lock:
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+        time.sleep(0.01)
+        with lock:
+            active[host] -= 1
+
+    with Scheduler(max_connections=8, max_per_host=2) as scheduler:
+        futures = [
+            scheduler.submit(f"https://{host}/page", fetch, host)
+            for host in ["a.com", "b.com"] * 10
+        ]
+        [f.result() for f in futures]
+    assert peak == {"a.com": 2, "b.com": 2}
+
+
+def test_busy_host_does_not_hold_up_other_hosts():
+    started = {}
+    release = threading.Event()
+
+    def fetch(host):
+        started.setdefault(host, time.monotonic())
+        if host == "a.com":
+            release.wait(1)
+
+    with Scheduler(max_connections=4, max_per_host=1) as scheduler:
+        futures = [
+            scheduler.submit(f"https://{host}/page", fetch, host)
+            for host in ["a.com"] * 4 + ["b.com"]
+        ]
+        futures[-1].result(timeout=0.5)
+        release.set()
+        [f.result() for f in futures]
+    assert started["b.com"] - started["a.com"] < 0.5
@@ -1,13 +1,18 @@
+import threading
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
 from unittest import mock
 
 import pytest
+from dropbox.files import FileMetadata
 
-from scraper.manga import Manga
+from scraper.manga import Manga, Volume
 from scraper.uploaders.uploaders import DropboxUploader, MegaUploader, PcloudUploader
 from tests.helpers import (
     MockedDropbox,
     MockedDropboxRealFile,
+    MockedDropboxSession,
     MockedMega,
     MockedMegaNotFound,
     MockedPyCloud,
@@ -34,6 +39,115 @@ def test_dropbox_upload(caplog, volume):
     assert response.text == "success"
 
 
+@mock.patch("scraper.uploaders.uploaders.dropbox.Dropbox", MockedDropboxSession)
+def test_dropbox_upload_in_chunks(volume):
+    volume.file_path = Path("tests/test_files/jpgs/test-manga_1_1.jpg")
+    dbox = setup_uploader(DropboxUploader)
+    dbox.chunk_size = 50_000
+    response = dbox.upload_volume(volume)
+    assert response.path_lower == str(volume.upload_path)
+    assert b"".join(dbox.api.chunks) == volume.file_path.read_bytes()
+    assert all(len(chunk) <= dbox.chunk_size for chunk in dbox.api.chunks)
+    assert len(dbox.api.chunks) > 2
+
+
+@mock.patch("scraper.uploaders.uploaders.dropbox.Dropbox", MockedDropboxSession)
+def test_dropbox_upload_from_memory(volume):
+    data = Path("tests/test_files/jpgs/test-manga_1_1.jpg").read_bytes()
+    dbox = setup_uploader(DropboxUploader)
+    dbox.chunk_size = 50_000
+    response = dbox.upload_volume(volume, BytesIO(data))
+    assert response.path_lower == str(volume.upload_path)
+    assert b"".join(dbox.api.chunks) == data
+
+
+@mock.patch("scraper.uploaders.uploaders.dropbox.Dropbox", MockedDropboxSession)
+def test_dropbox_upload_from_stream(volume):
+    class Stream(BytesIO):
+        def seekable(self):
+            return False
+
+    dbox = setup_uploader(DropboxUploader)
+    # even a stream smaller than a chunk can't be sized up front
+    response = dbox.upload_volume(volume, Stream(b"%PDF-"))
+    assert response.path_lower == str(volume.upload_path)
+    assert b"".join(dbox.api.chunks) == b"%PDF-"
+
+
+@mock.patch("scraper.uploaders.uploaders.dropbox.Dropbox", MockedDropbox)
+def test_dropbox_lists_directory_once(volume):
+    dbox = setup_uploader(DropboxUploader)
+    other_volume = Volume(2, volume.file_path, Path("/some/other"))
+    with mock.patch.object(
+        dbox.api, "files_list_folder", wraps=dbox.api.files_list_folder
+    ) as listed:
+        with mock.patch.object(dbox.api, "files_search") as searched:
+            assert dbox.volume_exists(volume)
+            assert not dbox.volume_exists(other_volume)
+    listed.assert_called_once_with("/some")
+    searched.assert_not_called()
+
+
+@mock.patch("scraper.uploaders.uploaders.dropbox.Dropbox", MockedDropbox)
+def test_different_directories_listed_at_once():
+    dbox = setup_uploader(DropboxUploader)
+    other_listed = threading.Event()
+
+    def list_directory(directory):
+        if directory == Path("/slow"):
+            # only returns if /fast can be listed while /slow is being listed
+            assert other_listed.wait(1)
+        else:
+            other_listed.set()
+        return {}
+
+    with mock.patch.object(dbox, "list_directory", side_effect=list_directory):
+        with ThreadPool(2) as pool:
+            pool.map(dbox.remote_files, [Path("/slow"), Path("/fast")])
+
+
+@mock.patch("scraper.uploaders.uploaders.dropbox.Dropbox", MockedDropbox)
+def test_dropbox_list_directory_pages():
+    dbox = setup_uploader(DropboxUploader)
+    first = mock.MagicMock(has_more=True, cursor="cursor")
+    first.entries = [FileMetadata(name="a.pdf", size=1)]
+    second = mock.MagicMock(has_more=False)
+    second.entries = [FileMetadata(name="b.pdf", size=2)]
+    with mock.patch.object(dbox.api, "files_list_folder", return_value=first):
+        with mock.patch.object(
+            dbox.api, "files_list_folder_continue", return_value=second, create=True
+        ) as continued:
+            assert dbox.list_directory(Path("/manga")) == {"a.pdf": 1, "b.pdf": 2}
+    continued.assert_called_once_with("cursor")
+
+
+@mock.patch("scraper.uploaders.uploaders.Mega", MockedMega)
+def test_mega_volume_exists_from_listing(volume):
+    volume.file_path = Path("tests/test_files/jpgs/test-manga_1_1.jpg")
+    mega = setup_uploader(MegaUploader)
+    with mock.patch.object(mega.api, "find", return_value=["start"]) as found:
+        assert mega.volume_exists(volume)
+        volume.file_path = Path("tests/test_files/jpgs/test-manga_1_2.jpg")
+        assert not mega.volume_exists(volume)
+    # only the directory is looked up, not each volume
+    found.assert_called_once_with(volume.upload_path.parent)
+
+
+@mock.patch("scraper.uploaders.uploaders.Mega", MockedMega)
+def test_mega_uploaded_before_prepare(volume):
+    mega = setup_uploader(MegaUploader)
+    assert mega.dirname is None
+    assert mega.uploaded(volume.upload_path.with_name("test-manga_1_1.jpg"))
+    assert not mega.uploaded(volume.upload_path.with_name("test-manga_1_2.jpg"))
+
+
+@mock.patch("scraper.uploaders.uploaders.Mega", MockedMegaNotFound)
+def test_mega_uploaded_without_directory(volume):
+    mega = setup_uploader(MegaUploader)
+    assert not mega.uploaded(volume.upload_path)
+    assert mega.remote_files(volume.upload_path.parent) == {}
+
+
 @mock.patch("scraper.uploaders.uploaders.Mega", MockedMegaNotFound)
 def test_mega_upload(volume):
     mega = setup_uploader(MegaUploader)
@@ -41,6 +155,13 @@ def test_mega_upload(volume):
     assert response == {"status": "success"}
 
 
+@mock.patch("scraper.uploaders.uploaders.Mega", MockedMegaNotFound)
+def test_mega_upload_from_memory_fails(volume):
+    mega = setup_uploader(MegaUploader)
+    with pytest.raises(IOError):
+        mega.upload_volume(volume, BytesIO(b"%PDF-"))
+
+
 @mock.patch("scraper.uploaders.uploaders.Mega", MockedMega)
 def test_mega_set_dirname():
     manga = Manga("dragon-ball", "pdf")
@@ -59,6 +180,31 @@ def test_mega_set_dirname_if_dir_not_in_cloud():
     assert mega.dirname == "two"
 
 
+def test_pycloud_lists_uploaded_volumes():
+    listed = {
+        "result": 0,
+        "metadata": {
+            "contents": [
+                {"name": "manga_volume_1.pdf", "size": 10, "isfolder": False},
+                {"name": "extras", "isfolder": True},
+            ]
+        },
+    }
+    with mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloud):
+        with mock.patch.object(MockedPyCloud, "listed", listed):
+            pycloud = setup_uploader(PcloudUploader)
+            assert pycloud.uploaded(Path("/manga/manga_volume_1.pdf"))
+            assert not pycloud.uploaded(Path("/manga/manga_volume_2.pdf"))
+            assert not pycloud.uploaded(Path("/manga/extras"))
+
+
+@mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloud)
+def test_pycloud_nothing_uploaded_to_missing_directory():
+    pycloud = setup_uploader(PcloudUploader)
+    assert pycloud.list_directory(Path("/manga")) == {}
+    assert not pycloud.uploaded(Path("/manga/manga_volume_1.pdf"))
+
+
 @mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloud)
 def test_pycloud_create_directory_if_not_present_in_the_cloud():
     pycloud = setup_uploader(PcloudUploader)
@@ -83,6 +229,21 @@ def test_pycloud_create_directories():
     assert responses[0] == {"result": 0, "metadata": "path"}
 
 
+@mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloud)
+def test_pycloud_creates_each_directory_once():
+    pycloud = setup_uploader(PcloudUploader)
+    files = [Path(f"/path/to/file_{n}.txt") for n in range(20)]
+    with mock.patch.object(
+        pycloud.api, "listfolder", wraps=pycloud.api.listfolder
+    ) as listed:
+        with ThreadPool(8) as pool:
+            pool.map(pycloud.create_directories_recursively, files)
+    assert sorted(c[1]["path"] for c in listed.call_args_list) == [
+        "/path",
+        "/path/to",
+    ]
+
+
 @mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloudFail)
 def test_pycloud_create_directories_fail():
     file = Path("/path/to/file.txt")
@@ -127,3 +288,38 @@ def test_upload_calls(to_mock, mock_obj, uploader):
         responses = uploader(manga)
         assert len(responses) == 2
         assert all(x == {"status": "success"} for x in responses)
+
+
+@mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloud)
+def test_upload_saved_volume_removes_file(tmp_path):
+    manga = Manga("dragon-ball", "pdf")
+    manga.add_volume(1)
+    manga.add_volume(2)
+    pycloud = setup_uploader(PcloudUploader)
+    for volume in manga.volumes:
+        volume.file_path = tmp_path / f"volume_{volume.number}.pdf"
+        volume.file_path.write_bytes(b"%PDF-")
+    with mock.patch.object(pycloud, "prepare", wraps=pycloud.prepare) as prepared:
+        for volume in manga.volumes:
+            response = pycloud.upload_saved_volume(manga, volume, remove=True)
+            assert response == {"status": "success"}
+            assert not volume.file_path.exists()
+    prepared.assert_called_once_with(manga)
+
+
+@mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloud)
+def test_pycloud_upload_streams_from_disk(volume):
+    pycloud = setup_uploader(PcloudUploader)
+    with mock.patch.object(pycloud.api, "uploadfile", wraps=pycloud.api.uploadfile):
+        response = pycloud.upload_volume(volume)
+        uploaded = pycloud.api.uploadfile.call_args[1]
+    assert uploaded["files"] == [str(volume.file_path)]
+    assert "data" not in uploaded
+    assert response == {"status": "success"}
+
+
+@mock.patch("scraper.uploaders.uploaders.PyCloud", MockedPyCloud)
+def test_pycloud_upload_from_memory_fails(volume):
+    pycloud = setup_uploader(PcloudUploader)
+    with pytest.raises(IOError):
+        pycloud.upload_volume(volume, BytesIO(b"%PDF-"))
@@ -1,4 +1,6 @@
+import os
 import shutil
+import time
 from pathlib import Path
 from unittest import mock
 
@@ -6,11 +8,14 @@ import pytest
 
 from scraper.exceptions import CannotExtractChapter
 from scraper.utils import (
+    SETTINGS_CHECK_INTERVAL,
     CustomAdapter,
     create_base_config,
     extract_chapter_number,
     get_adapter,
+    get_session,
     menu_input,
+    override_settings,
     request_session,
     settings,
 )
@@ -80,6 +85,43 @@ def test_settings_creates_base_config():
         assert Path("/tmp/.config/mangascraper.ini").exists()
 
 
+def test_settings_cached_until_modified(tmp_path):
+    with mock.patch("scraper.utils.Path.home", lambda: tmp_path):
+        create_base_config()
+        with mock.patch("scraper.utils.configparser.ConfigParser.read") as read:
+            settings()
+            settings()
+            assert read.call_count == 1
+            config_file = tmp_path / ".config" / "mangascraper.ini"
+            os.utime(config_file, ns=(0, 0))
+            settings()
+            # the file isn't checked again until the interval has passed
+            assert read.call_count == 1
+            later = time.monotonic() + SETTINGS_CHECK_INTERVAL
+            with mock.patch("scraper.utils.time.monotonic", return_value=later):
+                settings()
+            assert read.call_count == 2
+
+
+def test_settings_read_only(tmp_path):
+    with mock.patch("scraper.utils.Path.home", lambda: tmp_path):
+        config = settings()
+        with pytest.raises(TypeError):
+            config["config"]["source"] = "mangafast"
+        assert settings()["config"]["source"] == "mangareader"
+
+
+def test_settings_overrides(tmp_path, monkeypatch):
+    monkeypatch.setenv("MANGASCRAPER_FILETYPE", "cbz")
+    monkeypatch.setenv("MANGASCRAPER_SOURCE", "mangafast")
+    with mock.patch("scraper.utils.Path.home", lambda: tmp_path):
+        create_base_config()
+        override_settings(source="mangareader")
+        config = settings()["config"]
+        assert config["filetype"] == "cbz"
+        assert config["source"] == "mangareader"
+
+
 def test_requests_session():
     req = request_session(max_attempts=34, intervals=0.5)
     assert len(req.adapters) == 2
@@ -93,6 +135,21 @@ def test_requests_session():
     assert https.max_retries.backoff_factor == 0.5
 
 
+def test_requests_session_pool_size():
+    req = request_session(pool_size=16)
+    assert req.adapters["https://"]._pool_maxsize == 16
+
+
+def test_get_session_is_shared():
+    assert get_session() is get_session()
+
+
+def test_get_session_recreated_after_fork():
+    session = get_session()
+    with mock.patch("scraper.utils.os.getpid", return_value=-1):
+        assert get_session() is not session
+
+
 @pytest.mark.parametrize("inputs", ["q", "Q", "quit", "QUit"])
 def test_menu_input_quit(inputs, monkeypatch):
     gen = (x for x in inputs)